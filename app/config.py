@@ -3,7 +3,8 @@ Configuration settings for the transaction analytics service.
 """
 
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -25,6 +26,47 @@ class Settings(BaseSettings):
     
     # API settings
     api_prefix: str = Field(default="/api/v1", description="API prefix")
+    cors_origins: List[str] = Field(
+        default=[],
+        description="Exact origins allowed to make cross-origin requests; none by default"
+    )
+    cors_max_age: int = Field(
+        default=86400,
+        description="Seconds browsers may cache CORS preflight responses"
+    )
+    
+    # Concurrency settings, per uvicorn worker process. A deployment opens up
+    # to workers * (db_pool_size + db_max_overflow) PostgreSQL connections,
+    # which must stay below max_connections (100 by default, 3 of them
+    # reserved for superusers): the defaults allow 3 workers.
+    threadpool_size: int = Field(
+        default=100,
+        description="Worker threads per process for synchronous endpoints"
+    )
+    db_pool_size: int = Field(
+        default=20,
+        description="Database connections each process keeps open"
+    )
+    db_max_overflow: int = Field(
+        default=10,
+        description="Extra database connections each process may open under load"
+    )
+    
+    # Data settings
+    user_countries_path: str = Field(
+        default="data/user_countries.csv",
+        description="Path to the user-country mapping CSV"
+    )
+    
+    # Cache settings
+    redis_url: Optional[str] = Field(
+        default=None,
+        description="Redis URL for caching report responses; caching is disabled when unset"
+    )
+    report_cache_ttl: int = Field(
+        default=60,
+        description="Seconds cached report responses are kept"
+    )
     
     # Test database settings
     test_database_url: str = Field(
@@ -37,5 +79,19 @@ class Settings(BaseSettings):
         case_sensitive = False
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Dependency to get application settings.
+    
+    Settings are parsed once and shared; tests can replace them through
+    app.dependency_overrides[get_settings].
+    
+    Returns:
+        Settings: Application settings
+    """
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
@@ -8,9 +8,13 @@ from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
 
-# Create database engine
+# Create database engine. The pool is smaller than the threadpool: report
+# requests answered from the cache never check out a connection, and the
+# rest wait up to the pool timeout (30s) for one
 engine = create_engine(
     settings.database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
     pool_pre_ping=True,
     echo=settings.debug
 )
@@ -2,11 +2,31 @@
 Main FastAPI application for transaction analytics.
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
-from app.config import settings
+from app.config import Settings, get_settings, settings
 from app.routers import reports, country_reports
+from app.utils.cache import close_cache, init_cache
+from app.utils.data_loader import load_user_countries
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Set up shared resources on startup and release them on shutdown."""
+    # Report endpoints are sync and run in the threadpool; raise AnyIO's
+    # default limit of 40 threads so more of them can be in flight
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    # Load the user-country mapping once so requests share it
+    app.state.user_countries = load_user_countries(settings.user_countries_path)
+    init_cache(settings.redis_url)
+    yield
+    close_cache()
 
 # Create FastAPI application
 app = FastAPI(
@@ -14,25 +34,31 @@ app = FastAPI(
     version=settings.app_version,
     description="API for transaction analytics and reporting",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=settings.cors_max_age,
 )
 
+# Compress larger responses (daily breakdowns, country lists)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include routers
 app.include_router(reports.router)
 app.include_router(country_reports.router)
 
 
 @app.get("/")
-async def root():
+async def root(settings: Settings = Depends(get_settings)):
     """Root endpoint."""
     return {
         "message": "Transaction Analytics API",
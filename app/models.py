@@ -4,11 +4,12 @@ SQLAlchemy models for users and transactions.
 
 from datetime import datetime
 from decimal import Decimal
+from enum import Enum
 from typing import Optional
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, 
-    Enum, ForeignKey, Index, Integer, Numeric, String
+    DDL, Boolean, Column, Connection, Date, DateTime, Enum as SAEnum,
+    ForeignKey, Index, Integer, Numeric, String, delete, event, insert, select
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -20,12 +21,23 @@ class TransactionType(str, Enum):
     """Transaction type enumeration."""
     PAYMENT = "payment"
     INVOICE = "invoice"
+    
+    def __str__(self) -> str:
+        return self.value
 
 
 class TransactionStatus(str, Enum):
     """Transaction status enumeration."""
     SUCCESSFUL = "successful"
     FAILED = "failed"
+    
+    def __str__(self) -> str:
+        return self.value
+
+
+def _enum_values(enum_cls: type) -> list:
+    """Store enum values (e.g. 'successful') rather than member names in the database."""
+    return [member.value for member in enum_cls]
 
 
 class User(Base):
@@ -82,25 +94,40 @@ class Transaction(Base):
     """
     __tablename__ = "transactions"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
-    status = Column(String(20), nullable=False, index=True)
-    type = Column(String(20), nullable=False, index=True)
-    transaction_date = Column(DateTime(timezone=True), nullable=False, index=True)
+    status = Column(
+        SAEnum(TransactionStatus, name="transaction_status", values_callable=_enum_values),
+        nullable=False
+    )
+    type = Column(
+        SAEnum(TransactionType, name="transaction_type", values_callable=_enum_values),
+        nullable=False
+    )
+    transaction_date = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relationships
-    user = relationship("User", back_populates="transactions")
+    user = relationship("User", back_populates="transactions", lazy="raise")
     
-    # Indexes for performance optimization
+    # Indexes are kept to the two that report queries use, since every
+    # one of them is maintained on the insert path alongside the daily
+    # stats trigger. Daily and monthly reports read daily_transaction_stats
+    # and need no index here.
     __table_args__ = (
-        Index('idx_transactions_user_status', 'user_id', 'status'),
-        Index('idx_transactions_date_status', 'transaction_date', 'status'),
-        Index('idx_transactions_type_status', 'type', 'status'),
+        # Per-user history; the user_id prefix also serves the foreign key
         Index('idx_transactions_user_date', 'user_id', 'transaction_date'),
-        Index('idx_transactions_amount_status', 'amount', 'status'),
+        # Date range scans for metrics, top transactions, the country
+        # aggregates and the trigger recompute. Status and type filter
+        # inside the range (including "all"), amount makes SUM/MIN/MAX
+        # index-only and PostgreSQL also covers user_id for the country query
+        Index(
+            'idx_transactions_date_status_type_amount',
+            'transaction_date', 'status', 'type', 'amount',
+            postgresql_include=['user_id']
+        ),
     )
     
     def __repr__(self) -> str:
@@ -110,3 +137,196 @@ class Transaction(Base):
     def amount_decimal(self) -> Decimal:
         """Get amount as Decimal for precise calculations."""
         return Decimal(str(self.amount))
+
+
+class DailyStats(Base):
+    """
+    Per-day transaction aggregates for each status and type.
+    
+    Rows are maintained by database triggers on the transactions table, so
+    daily and monthly reports scan one row per day and group instead of
+    every transaction.
+    
+    Attributes:
+        date: Calendar day of the transactions
+        status: Transaction status
+        type: Transaction type
+        transaction_count: Number of transactions
+        total_amount: Sum of amounts
+        min_amount: Smallest amount
+        max_amount: Largest amount
+    """
+    __tablename__ = "daily_transaction_stats"
+    
+    date = Column(Date, primary_key=True)
+    status = Column(
+        SAEnum(TransactionStatus, name="transaction_status", values_callable=_enum_values),
+        primary_key=True
+    )
+    type = Column(
+        SAEnum(TransactionType, name="transaction_type", values_callable=_enum_values),
+        primary_key=True
+    )
+    transaction_count = Column(Integer, nullable=False)
+    total_amount = Column(Numeric(16, 2), nullable=False)
+    min_amount = Column(Numeric(10, 2), nullable=False)
+    max_amount = Column(Numeric(10, 2), nullable=False)
+    
+    def __repr__(self) -> str:
+        return f"<DailyStats(date={self.date}, status={self.status}, type={self.type}, count={self.transaction_count})>"
+
+
+# Triggers keeping daily_transaction_stats in sync with transactions.
+# Inserts update the day's row incrementally; updates and deletes recompute
+# the affected groups, since min/max cannot be adjusted incrementally.
+# create_all installs them through install_daily_stats; the initial Alembic
+# revision carries its own copy, so later edits here need a new revision.
+_PG_RECOMPUTE_DAILY_STATS = DDL("""
+CREATE OR REPLACE FUNCTION recompute_daily_transaction_stats(
+    p_date date, p_status transaction_status, p_type transaction_type
+) RETURNS void AS $$
+BEGIN
+    DELETE FROM daily_transaction_stats
+    WHERE date = p_date AND status = p_status AND type = p_type;
+    
+    INSERT INTO daily_transaction_stats
+        (date, status, type, transaction_count, total_amount, min_amount, max_amount)
+    SELECT p_date, p_status, p_type, count(*), sum(amount), min(amount), max(amount)
+    FROM transactions
+    WHERE transaction_date >= p_date AND transaction_date < p_date + 1
+        AND status = p_status AND type = p_type
+    HAVING count(*) > 0;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+_PG_DAILY_STATS_TRIGGER_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION daily_transaction_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO daily_transaction_stats AS s
+            (date, status, type, transaction_count, total_amount, min_amount, max_amount)
+        VALUES (NEW.transaction_date::date, NEW.status, NEW.type, 1, NEW.amount, NEW.amount, NEW.amount)
+        ON CONFLICT (date, status, type) DO UPDATE SET
+            transaction_count = s.transaction_count + 1,
+            total_amount = s.total_amount + EXCLUDED.total_amount,
+            min_amount = LEAST(s.min_amount, EXCLUDED.min_amount),
+            max_amount = GREATEST(s.max_amount, EXCLUDED.max_amount);
+        RETURN NULL;
+    END IF;
+    
+    PERFORM recompute_daily_transaction_stats(OLD.transaction_date::date, OLD.status, OLD.type);
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM recompute_daily_transaction_stats(NEW.transaction_date::date, NEW.status, NEW.type);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+_PG_DAILY_STATS_TRIGGER = DDL("""
+CREATE OR REPLACE TRIGGER trg_transactions_daily_stats
+AFTER INSERT OR UPDATE OR DELETE ON transactions
+FOR EACH ROW EXECUTE FUNCTION daily_transaction_stats_trigger()
+""")
+
+_SQLITE_RECOMPUTE_DAILY_STATS = """
+    DELETE FROM daily_transaction_stats
+    WHERE date = date({row}.transaction_date) AND status = {row}.status AND type = {row}.type;
+    INSERT INTO daily_transaction_stats
+        (date, status, type, transaction_count, total_amount, min_amount, max_amount)
+    SELECT date({row}.transaction_date), {row}.status, {row}.type,
+        count(*), sum(amount), min(amount), max(amount)
+    FROM transactions
+    WHERE transaction_date >= date({row}.transaction_date)
+        AND transaction_date < date({row}.transaction_date, '+1 day')
+        AND status = {row}.status AND type = {row}.type
+    HAVING count(*) > 0;
+"""
+
+_SQLITE_DAILY_STATS_TRIGGERS = [
+    DDL("""
+CREATE TRIGGER IF NOT EXISTS trg_transactions_daily_stats_insert
+AFTER INSERT ON transactions
+BEGIN
+    INSERT INTO daily_transaction_stats
+        (date, status, type, transaction_count, total_amount, min_amount, max_amount)
+    VALUES (date(NEW.transaction_date), NEW.status, NEW.type, 1, NEW.amount, NEW.amount, NEW.amount)
+    ON CONFLICT (date, status, type) DO UPDATE SET
+        transaction_count = transaction_count + 1,
+        total_amount = total_amount + excluded.total_amount,
+        min_amount = min(min_amount, excluded.min_amount),
+        max_amount = max(max_amount, excluded.max_amount);
+END
+"""),
+    DDL(f"""
+CREATE TRIGGER IF NOT EXISTS trg_transactions_daily_stats_update
+AFTER UPDATE ON transactions
+BEGIN
+{_SQLITE_RECOMPUTE_DAILY_STATS.format(row="OLD")}
+{_SQLITE_RECOMPUTE_DAILY_STATS.format(row="NEW")}
+END
+"""),
+    DDL(f"""
+CREATE TRIGGER IF NOT EXISTS trg_transactions_daily_stats_delete
+AFTER DELETE ON transactions
+BEGIN
+{_SQLITE_RECOMPUTE_DAILY_STATS.format(row="OLD")}
+END
+"""),
+]
+
+_DAILY_STATS_DDL = {
+    "postgresql": [_PG_RECOMPUTE_DAILY_STATS, _PG_DAILY_STATS_TRIGGER_FUNCTION, _PG_DAILY_STATS_TRIGGER],
+    "sqlite": _SQLITE_DAILY_STATS_TRIGGERS,
+}
+
+
+def install_daily_stats(connection: Connection) -> None:
+    """
+    Create the daily stats table and triggers, then backfill the table.
+    
+    Safe to run repeatedly: the table and triggers are only created when
+    missing and the backfill rebuilds every row from transactions. The
+    transactions table must already exist.
+    
+    Args:
+        connection: Connection to run the DDL and backfill on
+    """
+    dialect = connection.dialect.name
+    if dialect not in _DAILY_STATS_DDL:
+        raise NotImplementedError(f"Daily stats triggers are not available for {dialect}")
+    
+    DailyStats.__table__.create(connection, checkfirst=True)
+    for ddl in _DAILY_STATS_DDL[dialect]:
+        connection.execute(ddl)
+    
+    # Backfill rows written before the triggers existed
+    day = func.date(Transaction.transaction_date)
+    connection.execute(delete(DailyStats))
+    connection.execute(
+        insert(DailyStats).from_select(
+            [
+                DailyStats.date, DailyStats.status, DailyStats.type, DailyStats.transaction_count,
+                DailyStats.total_amount, DailyStats.min_amount, DailyStats.max_amount
+            ],
+            select(
+                day, Transaction.status, Transaction.type, func.count(),
+                func.sum(Transaction.amount), func.min(Transaction.amount), func.max(Transaction.amount)
+            ).group_by(day, Transaction.status, Transaction.type)
+        )
+    )
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_daily_stats_after_create(target, connection, tables=(), **kw):
+    """Install the daily stats triggers when create_all builds the transactions table."""
+    if Transaction.__table__ not in tables:
+        return
+    
+    dialect = connection.dialect.name
+    if dialect not in _DAILY_STATS_DDL:
+        print(f"Daily stats triggers are not available for {dialect}; daily_transaction_stats will stay empty")
+        return
+    
+    install_daily_stats(connection)
@@ -2,30 +2,35 @@
 Country-based transaction reports API endpoints.
 """
 
-from datetime import datetime, date
-from decimal import Decimal
+import heapq
+from datetime import date, timedelta
 from typing import Optional, List, Dict, Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import Float, Row, cast, func, select
 from sqlalchemy.orm import Session
-import pandas as pd
 
 from app.database import get_db
-from app.models import Transaction, TransactionStatus, User
-from app.utils.data_loader import load_user_countries
+from app.models import Transaction, TransactionStatus, TransactionType
+from app.utils.data_loader import get_user_countries
 
 router = APIRouter(prefix="/report", tags=["country_reports"])
 
+# Lookup tables for validating and converting filter query parameters
+_STATUS_MAP = {s.value: s for s in TransactionStatus}
+_TYPE_MAP = {t.value: t for t in TransactionType}
+
 
 @router.get("/by-country")
-async def get_country_report(
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+def get_country_report(
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
     status: str = Query("successful", description="Filter by status: successful, failed, all"),
     type: str = Query("all", description="Filter by type: payment, invoice, all"),
     sort_by: str = Query("total", description="Sort by: count, total, avg"),
     top_n: int = Query(10, description="Number of top countries to return", ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user_countries: Dict[int, str] = Depends(get_user_countries)
 ) -> Dict[str, Any]:
     """
     Generate transaction analytics report aggregated by country.
@@ -38,69 +43,44 @@ async def get_country_report(
         sort_by: Sort metric (count, total, avg)
         top_n: Number of countries to return
         db: Database session
+        user_countries: Mapping of user_id to country
         
     Returns:
         Dictionary with country-based transaction analytics
     """
     try:
-        # Parse dates
+        # Default to the current month
         default_start = date.today().replace(day=1)  # First day of current month
         default_end = date.today()
         
-        parsed_start_date = _parse_date(start_date) or default_start
-        parsed_end_date = _parse_date(end_date) or default_end
+        parsed_start_date = start_date or default_start
+        parsed_end_date = end_date or default_end
         
         # Validate date range
         if parsed_start_date > parsed_end_date:
             raise HTTPException(status_code=400, detail="Start date cannot be after end date")
         
         # Validate filters
-        if status not in ["all", "successful", "failed"]:
+        if status != "all" and status not in _STATUS_MAP:
             raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
         
-        if type not in ["all", "payment", "invoice"]:
+        if type != "all" and type not in _TYPE_MAP:
             raise HTTPException(status_code=400, detail=f"Invalid type: {type}")
         
         if sort_by not in ["count", "total", "avg"]:
             raise HTTPException(status_code=400, detail=f"Invalid sort_by: {sort_by}")
         
-        # Load user-country mapping
-        user_countries = load_user_countries("data/user_countries.csv")
+        # Check user-country mapping
         if not user_countries:
             raise HTTPException(status_code=500, detail="Could not load user-country data")
         
-        # Get transaction data
-        transactions_df = _get_transactions_dataframe(
-            db, parsed_start_date, parsed_end_date, status, type
+        # Aggregate per user in the database, then roll up to countries
+        user_rows = _get_user_aggregates(
+            db, parsed_start_date, parsed_end_date, _STATUS_MAP.get(status), _TYPE_MAP.get(type)
         )
+        country_stats = _aggregate_by_country(user_rows, user_countries)
         
-        if transactions_df.empty:
-            return {
-                "period": {
-                    "start_date": parsed_start_date.isoformat(),
-                    "end_date": parsed_end_date.isoformat()
-                },
-                "filters": {
-                    "status": status,
-                    "type": type,
-                    "sort_by": sort_by,
-                    "top_n": top_n
-                },
-                "countries": [],
-                "summary": {
-                    "total_countries": 0,
-                    "total_transactions": 0,
-                    "total_amount": 0.0
-                }
-            }
-        
-        # Map users to countries
-        transactions_df['country'] = transactions_df['user_id'].map(user_countries)
-        
-        # Filter out transactions without country mapping
-        transactions_df = transactions_df.dropna(subset=['country'])
-        
-        if transactions_df.empty:
+        if not country_stats:
             return {
                 "period": {
                     "start_date": parsed_start_date.isoformat(),
@@ -120,14 +100,11 @@ async def get_country_report(
                 }
             }
         
-        # Aggregate by country
-        country_stats = _aggregate_by_country(transactions_df)
-        
         # Sort and limit results
         sorted_countries = _sort_and_filter_countries(country_stats, sort_by, top_n)
         
         # Calculate summary statistics
-        summary = _calculate_country_summary(sorted_countries, transactions_df)
+        summary = _calculate_country_summary(sorted_countries, country_stats)
         
         return {
             "period": {
@@ -150,99 +127,92 @@ async def get_country_report(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-def _get_transactions_dataframe(
+def _get_user_aggregates(
     db: Session,
     start_date: date,
     end_date: date,
-    status_filter: str,
-    type_filter: str
-) -> pd.DataFrame:
+    status_filter: Optional[TransactionStatus],
+    type_filter: Optional[TransactionType]
+) -> List[Row]:
     """
-    Get transactions as pandas DataFrame.
+    Get transaction count and total amount per user.
+    
+    Aggregating in the database keeps the result size proportional to the
+    number of users instead of the number of transactions. The sum is cast
+    to a float server-side so rows arrive as machine numbers, not Decimals.
     
     Args:
         db: Database session
         start_date: Start date
         end_date: End date
-        status_filter: Status filter
-        type_filter: Type filter
+        status_filter: Status filter, or None for all
+        type_filter: Type filter, or None for all
         
     Returns:
-        DataFrame with transaction data
+        Rows with user_id, transaction_count and total_amount
     """
     # Build base query
-    query = db.query(
+    query = select(
         Transaction.user_id,
-        Transaction.amount,
-        Transaction.status,
-        Transaction.type,
-        Transaction.transaction_date
-    ).filter(
+        func.count(Transaction.id).label('transaction_count'),
+        cast(func.sum(Transaction.amount), Float).label('total_amount')
+    ).where(
         Transaction.transaction_date >= start_date,
-        Transaction.transaction_date <= end_date
+        Transaction.transaction_date < end_date + timedelta(days=1)
     )
     
     # Apply status filter
-    if status_filter != "all":
-        status_enum = TransactionStatus(status_filter.lower())
-        query = query.filter(Transaction.status == status_enum)
+    if status_filter is not None:
+        query = query.where(Transaction.status == status_filter)
     
     # Apply type filter
-    if type_filter != "all":
-        type_enum = TransactionType(type_filter.lower())
-        query = query.filter(Transaction.type == type_enum)
+    if type_filter is not None:
+        query = query.where(Transaction.type == type_filter)
     
-    # Execute query and convert to DataFrame
-    results = query.all()
+    query = query.group_by(Transaction.user_id)
     
-    if not results:
-        return pd.DataFrame()
-    
-    # Convert to DataFrame
-    data = []
-    for result in results:
-        data.append({
-            'user_id': result.user_id,
-            'amount': float(result.amount),
-            'status': result.status,
-            'type': result.type,
-            'transaction_date': result.transaction_date
-        })
-    
-    return pd.DataFrame(data)
+    return db.execute(query).all()
 
 
-def _aggregate_by_country(transactions_df: pd.DataFrame) -> List[Dict[str, Any]]:
+def _aggregate_by_country(
+    user_rows: List[Row],
+    user_countries: Dict[int, str]
+) -> List[Dict[str, Any]]:
     """
-    Aggregate transaction data by country.
+    Roll per-user aggregates up to country statistics.
     
     Args:
-        transactions_df: DataFrame with transaction data
+        user_rows: Per-user aggregates from _get_user_aggregates
+        user_countries: Mapping of user_id to country
         
     Returns:
         List of country statistics
     """
-    # Group by country and calculate metrics
-    grouped = transactions_df.groupby('country').agg({
-        'amount': ['sum', 'mean', 'count'],
-        'user_id': 'nunique'  # Count unique users
-    }).round(2)
-    
-    # Flatten column names
-    grouped.columns = ['total_amount', 'average_amount', 'transaction_count', 'unique_users']
+    stats: Dict[str, Dict[str, Any]] = {}
     
-    # Reset index to make country a column
-    grouped = grouped.reset_index()
+    for row in user_rows:
+        country = user_countries.get(row.user_id)
+        if country is None:
+            # Skip users without country mapping
+            continue
+        
+        entry = stats.setdefault(country, {
+            "transaction_count": 0,
+            "total_amount": 0.0,
+            "unique_users": 0
+        })
+        entry["transaction_count"] += row.transaction_count
+        entry["total_amount"] += row.total_amount
+        entry["unique_users"] += 1
     
-    # Convert to list of dictionaries
     countries = []
-    for _, row in grouped.iterrows():
+    for country, entry in stats.items():
         countries.append({
-            "country": row['country'],
-            "transaction_count": int(row['transaction_count']),
-            "total_amount": float(row['total_amount']),
-            "average_amount": float(row['average_amount']),
-            "unique_users": int(row['unique_users'])
+            "country": country,
+            "transaction_count": entry["transaction_count"],
+            "total_amount": round(entry["total_amount"], 2),
+            "average_amount": round(entry["total_amount"] / entry["transaction_count"], 2),
+            "unique_users": entry["unique_users"]
         })
     
     return countries
@@ -271,27 +241,20 @@ def _sort_and_filter_countries(
         "avg": lambda x: x["average_amount"]
     }
     
-    # Sort countries
-    sorted_countries = sorted(
-        countries,
-        key=sort_mapping[sort_by],
-        reverse=True
-    )
-    
-    # Limit to top_n
-    return sorted_countries[:top_n]
+    # Select the top_n countries without sorting the full list
+    return heapq.nlargest(top_n, countries, key=sort_mapping[sort_by])
 
 
 def _calculate_country_summary(
     countries: List[Dict[str, Any]],
-    transactions_df: pd.DataFrame
+    all_countries: List[Dict[str, Any]]
 ) -> Dict[str, Any]:
     """
     Calculate summary statistics for country report.
     
     Args:
         countries: List of country statistics
-        transactions_df: Original transaction DataFrame
+        all_countries: Statistics for every country before top_n filtering
         
     Returns:
         Summary statistics
@@ -312,12 +275,14 @@ def _calculate_country_summary(
     # Average per country
     average_per_country = total_amount / len(countries) if countries else 0
     
-    # Get overall statistics from DataFrame
+    # Get overall statistics across all countries
+    total_transactions_all = sum(country["transaction_count"] for country in all_countries)
+    total_amount_all = sum(country["total_amount"] for country in all_countries)
     overall_stats = {
-        "total_countries_found": len(transactions_df['country'].unique()),
-        "total_transactions_all": len(transactions_df),
-        "total_amount_all": float(transactions_df['amount'].sum()),
-        "average_transaction_all": float(transactions_df['amount'].mean())
+        "total_countries_found": len(all_countries),
+        "total_transactions_all": total_transactions_all,
+        "total_amount_all": round(total_amount_all, 2),
+        "average_transaction_all": round(total_amount_all / total_transactions_all, 2)
     }
     
     return {
@@ -328,14 +293,3 @@ def _calculate_country_summary(
         "top_performer": countries[0]["country"] if countries else None,
         "overall_stats": overall_stats
     }
-
-
-def _parse_date(date_str: Optional[str]) -> Optional[date]:
-    """Parse date string in YYYY-MM-DD format."""
-    if not date_str:
-        return None
-    
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d").date()
-    except ValueError:
-        raise HTTPException(status_code=400, detail=f"Invalid date format: {date_str}. Use YYYY-MM-DD")
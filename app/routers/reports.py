@@ -2,24 +2,33 @@
 API endpoints for transaction reports and analytics.
 """
 
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 from typing import Optional, List, Dict, Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.database import get_db
 from app.models import Transaction, TransactionStatus, TransactionType
 from app.utils.analytics import TransactionAnalytics
+from app.utils.cache import cached, conditional_get
 
 router = APIRouter(prefix="/report", tags=["reports"])
 
+# Lookup tables for validating filter query parameters
+_STATUS_MAP = {s.value: s for s in TransactionStatus}
+_TYPE_MAP = {t.value: t for t in TransactionType}
+
 
 @router.get("/")
-async def get_transaction_report(
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+@conditional_get(max_age=settings.report_cache_ttl)
+@cached(prefix="report", expire=settings.report_cache_ttl)
+def get_transaction_report(
+    request: Request,
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
     status: str = Query("all", description="Filter by status: successful, failed, all"),
     type: str = Query("all", description="Filter by type: payment, invoice, all"),
     include_avg: bool = Query(False, description="Include average amount"),
@@ -34,6 +43,7 @@ async def get_transaction_report(
     Generate comprehensive transaction analytics report.
     
     Args:
+        request: Incoming request, used for conditional GETs
         start_date: Start date for filtering (optional)
         end_date: End date for filtering (optional)
         status: Filter by transaction status
@@ -50,30 +60,34 @@ async def get_transaction_report(
         Dictionary with comprehensive transaction analytics
     """
     try:
-        # Parse dates
+        # Default to the current month
         default_start = date.today().replace(day=1)  # First day of current month
         default_end = date.today()
         
-        parsed_start_date = _parse_date(start_date) or default_start
-        parsed_end_date = _parse_date(end_date) or default_end
+        parsed_start_date = start_date or default_start
+        parsed_end_date = end_date or default_end
         
         # Validate date range
         if parsed_start_date > parsed_end_date:
             raise HTTPException(status_code=400, detail="Start date cannot be after end date")
         
         # Validate filters
-        if status not in ["all", "successful", "failed"]:
+        if status != "all" and status not in _STATUS_MAP:
             raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
         
-        if type not in ["all", "payment", "invoice"]:
+        if type != "all" and type not in _TYPE_MAP:
             raise HTTPException(status_code=400, detail=f"Invalid type: {type}")
         
+        # Resolve filters to enums once; None means "all"
+        status_enum = _STATUS_MAP.get(status)
+        type_enum = _TYPE_MAP.get(type)
+        
         # Initialize analytics
         analytics = TransactionAnalytics(db)
         
         # Get comprehensive metrics
         metrics = analytics.get_comprehensive_metrics(
-            parsed_start_date, parsed_end_date, status, type
+            parsed_start_date, parsed_end_date, status_enum, type_enum
         )
         
         # Build response
@@ -108,17 +122,17 @@ async def get_transaction_report(
         
         # Add daily breakdown if requested
         if include_daily_shift:
-            daily_data = analytics.get_daily_trends(parsed_start_date, parsed_end_date, status, type)
+            daily_data = analytics.get_daily_trends(parsed_start_date, parsed_end_date, status_enum, type_enum)
             response["daily_breakdown"] = daily_data
         
         # Add monthly comparison if requested
         if include_monthly_comparison:
-            monthly_data = analytics.get_monthly_comparison(parsed_start_date, parsed_end_date, status, type)
+            monthly_data = analytics.get_monthly_comparison(parsed_start_date, parsed_end_date, status_enum, type_enum)
             response["monthly_comparison"] = monthly_data
         
         # Add top transactions if requested
         if include_top_transactions:
-            top_transactions = analytics.get_top_transactions(parsed_start_date, parsed_end_date, 10, status, type)
+            top_transactions = analytics.get_top_transactions(parsed_start_date, parsed_end_date, 10, status_enum, type_enum)
             response["top_transactions"] = top_transactions
         
         return response
@@ -130,7 +144,10 @@ async def get_transaction_report(
 
 
 @router.get("/summary")
-async def get_transaction_summary(
+@conditional_get(max_age=settings.report_cache_ttl)
+@cached(prefix="report", expire=settings.report_cache_ttl)
+def get_transaction_summary(
+    request: Request,
     days: int = Query(30, description="Number of days to analyze", ge=1, le=365),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
@@ -138,6 +155,7 @@ async def get_transaction_summary(
     Get quick transaction summary for the last N days.
     
     Args:
+        request: Incoming request, used for conditional GETs
         days: Number of days to look back
         db: Database session
         
@@ -167,14 +185,3 @@ async def get_transaction_summary(
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-
-
-def _parse_date(date_str: Optional[str]) -> Optional[date]:
-    """Parse date string in YYYY-MM-DD format."""
-    if not date_str:
-        return None
-    
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d").date()
-    except ValueError:
-        raise HTTPException(status_code=400, detail=f"Invalid date format: {date_str}. Use YYYY-MM-DD")
@@ -2,14 +2,97 @@
 Advanced analytics utilities for transaction reporting.
 """
 
-from datetime import date, datetime, timedelta
-from decimal import Decimal
+from datetime import date, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 
-from sqlalchemy import func, and_, or_, extract, case
+from sqlalchemy import Date, Float, func, and_, or_, cast
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
 
-from app.models import Transaction, TransactionStatus, TransactionType
+from app.models import DailyStats, Transaction, TransactionStatus, TransactionType
+
+
+class _month_start(FunctionElement):
+    """First day of the month of a timestamp, as a date."""
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(_month_start)
+def _compile_month_start(element, compiler, **kw):
+    # date_trunc yields a single grouping key instead of extract(year) + extract(month)
+    return "CAST(date_trunc('month', %s) AS DATE)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(_month_start, 'sqlite')
+def _compile_month_start_sqlite(element, compiler, **kw):
+    return "date(%s, 'start of month')" % compiler.process(element.clauses, **kw)
+
+
+def _build_base_filters(
+    start_date: date,
+    end_date: date,
+    status_filter: Optional[TransactionStatus] = None,
+    type_filter: Optional[TransactionType] = None
+) -> List[Any]:
+    """
+    Build the shared date range, status and type filter conditions.
+    
+    Args:
+        start_date: Start date for analysis
+        end_date: End date for analysis, included in full
+        status_filter: Status to filter by, or None for all
+        type_filter: Type to filter by, or None for all
+        
+    Returns:
+        List of filter conditions
+    """
+    # Half-open range so transactions later on the end date are included,
+    # matching the whole-day rows of the daily aggregates table
+    base_filters = [
+        Transaction.transaction_date >= start_date,
+        Transaction.transaction_date < end_date + timedelta(days=1)
+    ]
+    
+    if status_filter is not None:
+        base_filters.append(Transaction.status == status_filter)
+    
+    if type_filter is not None:
+        base_filters.append(Transaction.type == type_filter)
+    
+    return base_filters
+
+
+def _build_daily_stats_filters(
+    start_date: date,
+    end_date: date,
+    status_filter: TransactionStatus,
+    type_filter: Optional[TransactionType] = None
+) -> List[Any]:
+    """
+    Build filter conditions for the daily aggregates table.
+    
+    Args:
+        start_date: Start date for analysis
+        end_date: End date for analysis, included in full
+        status_filter: Status to filter by
+        type_filter: Type to filter by, or None for all
+        
+    Returns:
+        List of filter conditions
+    """
+    # Same half-open range as _build_base_filters
+    stats_filters = [
+        DailyStats.date >= start_date,
+        DailyStats.date < end_date + timedelta(days=1),
+        DailyStats.status == status_filter
+    ]
+    
+    if type_filter is not None:
+        stats_filters.append(DailyStats.type == type_filter)
+    
+    return stats_filters
 
 
 class TransactionAnalytics:
@@ -22,8 +105,8 @@ class TransactionAnalytics:
         self,
         start_date: date,
         end_date: date,
-        status_filter: str = "all",
-        type_filter: str = "all"
+        status_filter: Optional[TransactionStatus] = None,
+        type_filter: Optional[TransactionType] = None
     ) -> Dict[str, Any]:
         """
         Get comprehensive transaction metrics with optimized queries.
@@ -31,84 +114,70 @@ class TransactionAnalytics:
         Args:
             start_date: Start date for analysis
             end_date: End date for analysis
-            status_filter: Status filter (successful/failed/all)
-            type_filter: Type filter (payment/invoice/all)
+            status_filter: Status filter, or None for all
+            type_filter: Type filter, or None for all
             
         Returns:
             Dictionary with comprehensive metrics
         """
-        # Build base filter conditions
-        base_filters = [
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date
-        ]
+        base_filters = _build_base_filters(start_date, end_date, status_filter, type_filter)
         
-        # Add status filter
-        if status_filter != "all":
-            status_enum = TransactionStatus(status_filter.lower())
-            base_filters.append(Transaction.status == status_enum)
+        # Single query for basic, status and type metrics; the status- and
+        # type-specific aggregates use FILTER so the range is scanned once
+        is_successful = Transaction.status == TransactionStatus.SUCCESSFUL
+        is_failed = Transaction.status == TransactionStatus.FAILED
+        is_payment = Transaction.type == TransactionType.PAYMENT
+        is_invoice = Transaction.type == TransactionType.INVOICE
         
-        # Add type filter
-        if type_filter != "all":
-            type_enum = TransactionType(type_filter.lower())
-            base_filters.append(Transaction.type == type_enum)
-        
-        # Single query for basic metrics
-        basic_query = self.db.query(
+        metrics_query = self.db.query(
             func.count(Transaction.id).label('total_count'),
-            func.coalesce(func.sum(Transaction.amount), 0).label('total_amount'),
-            func.coalesce(func.avg(Transaction.amount), 0).label('avg_amount'),
-            func.coalesce(func.min(Transaction.amount), 0).label('min_amount'),
-            func.coalesce(func.max(Transaction.amount), 0).label('max_amount')
+            cast(func.coalesce(func.sum(Transaction.amount), 0), Float).label('total_amount'),
+            cast(func.coalesce(func.avg(Transaction.amount), 0), Float).label('avg_amount'),
+            cast(func.coalesce(func.min(Transaction.amount), 0), Float).label('min_amount'),
+            cast(func.coalesce(func.max(Transaction.amount), 0), Float).label('max_amount'),
+            func.count(Transaction.id).filter(is_successful).label('successful_count'),
+            cast(func.coalesce(func.sum(Transaction.amount).filter(is_successful), 0), Float).label('successful_amount'),
+            func.count(Transaction.id).filter(is_failed).label('failed_count'),
+            func.count(Transaction.id).filter(is_payment).label('payment_count'),
+            cast(func.coalesce(func.sum(Transaction.amount).filter(is_payment), 0), Float).label('payment_amount'),
+            func.count(Transaction.id).filter(is_invoice).label('invoice_count'),
+            cast(func.coalesce(func.sum(Transaction.amount).filter(is_invoice), 0), Float).label('invoice_amount')
         ).filter(and_(*base_filters))
         
-        basic_result = basic_query.first()
-        
-        # Successful transactions query
-        successful_filters = base_filters + [Transaction.status == TransactionStatus.SUCCESSFUL]
-        successful_query = self.db.query(
-            func.count(Transaction.id).label('successful_count'),
-            func.coalesce(func.sum(Transaction.amount), 0).label('successful_amount'),
-            func.coalesce(func.avg(Transaction.amount), 0).label('successful_avg')
-        ).filter(and_(*successful_filters))
-        
-        successful_result = successful_query.first()
-        
-        # Failed transactions query
-        failed_filters = base_filters + [Transaction.status == TransactionStatus.FAILED]
-        failed_query = self.db.query(
-            func.count(Transaction.id).label('failed_count'),
-            func.coalesce(func.sum(Transaction.amount), 0).label('failed_amount')
-        ).filter(and_(*failed_filters))
-        
-        failed_result = failed_query.first()
-        
-        # Type breakdown
-        type_breakdown = self._get_type_breakdown(base_filters)
+        metrics_result = metrics_query.first()
         
         # Calculate success rate
-        total_transactions = basic_result.total_count
-        success_rate = (successful_result.successful_count / total_transactions * 100) if total_transactions > 0 else 0
+        total_transactions = metrics_result.total_count
+        success_rate = (metrics_result.successful_count / total_transactions * 100) if total_transactions > 0 else 0
         
         return {
-            "total_transactions": basic_result.total_count,
-            "total_amount": float(basic_result.total_amount),
-            "average_amount": float(basic_result.avg_amount),
-            "minimum_amount": float(basic_result.min_amount),
-            "maximum_amount": float(basic_result.max_amount),
-            "successful_transactions": successful_result.successful_count,
-            "successful_amount": float(successful_result.successful_amount),
-            "failed_transactions": failed_result.failed_count,
+            "total_transactions": metrics_result.total_count,
+            "total_amount": metrics_result.total_amount,
+            "average_amount": metrics_result.avg_amount,
+            "minimum_amount": metrics_result.min_amount,
+            "maximum_amount": metrics_result.max_amount,
+            "successful_transactions": metrics_result.successful_count,
+            "successful_amount": metrics_result.successful_amount,
+            "failed_transactions": metrics_result.failed_count,
             "success_rate": round(success_rate, 2),
-            "type_breakdown": type_breakdown
+            "type_breakdown": {
+                "payment": {
+                    "count": metrics_result.payment_count,
+                    "amount": metrics_result.payment_amount
+                },
+                "invoice": {
+                    "count": metrics_result.invoice_count,
+                    "amount": metrics_result.invoice_amount
+                }
+            }
         }
     
     def get_daily_trends(
         self,
         start_date: date,
         end_date: date,
-        status_filter: str = "all",
-        type_filter: str = "all"
+        status_filter: Optional[TransactionStatus] = None,
+        type_filter: Optional[TransactionType] = None
     ) -> List[Dict[str, Any]]:
         """
         Get daily transaction trends with percentage changes.
@@ -116,77 +185,50 @@ class TransactionAnalytics:
         Args:
             start_date: Start date for analysis
             end_date: End date for analysis
-            status_filter: Status filter
-            type_filter: Type filter
+            status_filter: Status filter, or None for successful only
+            type_filter: Type filter, or None for all
             
         Returns:
             List of daily trend data
         """
-        # Build base filters
-        base_filters = [
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date,
-            Transaction.status == TransactionStatus.SUCCESSFUL
-        ]
-        
-        if status_filter != "all":
-            status_enum = TransactionStatus(status_filter.lower())
-            base_filters[2] = (Transaction.status == status_enum)
-        
-        if type_filter != "all":
-            type_enum = TransactionType(type_filter.lower())
-            base_filters.append(Transaction.type == type_enum)
+        # Trends default to successful transactions
+        stats_filters = _build_daily_stats_filters(
+            start_date, end_date, status_filter or TransactionStatus.SUCCESSFUL, type_filter
+        )
+        
+        # Daily aggregation over the pre-aggregated daily table (one row per
+        # day, status and type); percentage changes against the previous
+        # day are computed by the database with LAG() window functions
+        day = DailyStats.date
+        daily_count = func.sum(DailyStats.transaction_count)
+        daily_amount = cast(func.sum(DailyStats.total_amount), Float)
+        previous_count = func.lag(daily_count).over(order_by=day)
+        previous_amount = func.lag(daily_amount).over(order_by=day)
         
-        # Daily aggregation query
-        from sqlalchemy import text
-        
-        # Use different date functions for different databases
-        if self.db.bind.dialect.name == 'sqlite':
-            date_func = func.date(Transaction.transaction_date)
-        else:
-            date_func = func.date(Transaction.transaction_date)
-            
         daily_query = self.db.query(
-            date_func.label('date'),
-            func.count(Transaction.id).label('count'),
-            func.coalesce(func.sum(Transaction.amount), 0).label('total_amount'),
-            func.coalesce(func.avg(Transaction.amount), 0).label('avg_amount')
-        ).filter(and_(*base_filters)).group_by(
-            date_func
-        ).order_by('date')
+            day.label('date'),
+            daily_count.label('count'),
+            daily_amount.label('total_amount'),
+            (daily_amount / daily_count).label('avg_amount'),
+            cast((daily_amount - previous_amount) * 100.0 / func.nullif(previous_amount, 0), Float).label('amount_change'),
+            cast((daily_count - previous_count) * 100.0 / func.nullif(previous_count, 0), Float).label('count_change')
+        ).filter(and_(*stats_filters)).group_by(
+            day
+        ).order_by(day)
         
         results = daily_query.all()
         
-        # Calculate trends and percentage changes
-        trends = []
-        previous_amount = None
-        previous_count = None
-        
-        for result in results:
-            current_amount = float(result.total_amount)
-            current_count = result.count
-            
-            # Calculate percentage changes
-            amount_change = None
-            count_change = None
-            
-            if previous_amount is not None and previous_amount > 0:
-                amount_change = ((current_amount - previous_amount) / previous_amount) * 100
-            
-            if previous_count is not None and previous_count > 0:
-                count_change = ((current_count - previous_count) / previous_count) * 100
-            
-            trends.append({
+        trends = [
+            {
                 "date": result.date.isoformat(),
-                "transaction_count": current_count,
-                "total_amount": current_amount,
-                "average_amount": float(result.avg_amount),
-                "amount_change_percent": round(amount_change, 2) if amount_change is not None else None,
-                "count_change_percent": round(count_change, 2) if count_change is not None else None
-            })
-            
-            previous_amount = current_amount
-            previous_count = current_count
+                "transaction_count": result.count,
+                "total_amount": result.total_amount,
+                "average_amount": result.avg_amount,
+                "amount_change_percent": round(result.amount_change, 2) if result.amount_change is not None else None,
+                "count_change_percent": round(result.count_change, 2) if result.count_change is not None else None
+            }
+            for result in results
+        ]
         
         return trends
     
@@ -194,8 +236,8 @@ class TransactionAnalytics:
         self,
         start_date: date,
         end_date: date,
-        status_filter: str = "all",
-        type_filter: str = "all"
+        status_filter: Optional[TransactionStatus] = None,
+        type_filter: Optional[TransactionType] = None
     ) -> List[Dict[str, Any]]:
         """
         Get monthly comparison data.
@@ -203,95 +245,53 @@ class TransactionAnalytics:
         Args:
             start_date: Start date for analysis
             end_date: End date for analysis
-            status_filter: Status filter
-            type_filter: Type filter
+            status_filter: Status filter, or None for successful only
+            type_filter: Type filter, or None for all
             
         Returns:
             List of monthly comparison data
         """
-        # Build base filters
-        base_filters = [
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date,
-            Transaction.status == TransactionStatus.SUCCESSFUL
-        ]
-        
-        if status_filter != "all":
-            status_enum = TransactionStatus(status_filter.lower())
-            base_filters[2] = (Transaction.status == status_enum)
-        
-        if type_filter != "all":
-            type_enum = TransactionType(type_filter.lower())
-            base_filters.append(Transaction.type == type_enum)
-        
-        # Monthly aggregation query
+        # Comparisons default to successful transactions
+        stats_filters = _build_daily_stats_filters(
+            start_date, end_date, status_filter or TransactionStatus.SUCCESSFUL, type_filter
+        )
+        
+        # Monthly aggregation, rolled up from the daily table
+        month_start = _month_start(DailyStats.date).label('month_start')
+        monthly_count = func.sum(DailyStats.transaction_count)
+        monthly_amount = cast(func.sum(DailyStats.total_amount), Float)
         monthly_query = self.db.query(
-            extract('year', Transaction.transaction_date).label('year'),
-            extract('month', Transaction.transaction_date).label('month'),
-            func.count(Transaction.id).label('count'),
-            func.coalesce(func.sum(Transaction.amount), 0).label('total_amount'),
-            func.coalesce(func.avg(Transaction.amount), 0).label('avg_amount')
-        ).filter(and_(*base_filters)).group_by(
-            extract('year', Transaction.transaction_date),
-            extract('month', Transaction.transaction_date)
-        ).order_by('year', 'month')
+            month_start,
+            monthly_count.label('count'),
+            monthly_amount.label('total_amount'),
+            (monthly_amount / monthly_count).label('avg_amount')
+        ).filter(and_(*stats_filters)).group_by(month_start).order_by(month_start)
         
         results = monthly_query.all()
         
         # Format results
         monthly_data = []
         for result in results:
-            month_name = datetime(result.year, int(result.month), 1).strftime('%B %Y')
+            month_name = result.month_start.strftime('%B %Y')
             
             monthly_data.append({
                 "period": month_name,
-                "year": int(result.year),
-                "month": int(result.month),
+                "year": result.month_start.year,
+                "month": result.month_start.month,
                 "transaction_count": result.count,
-                "total_amount": float(result.total_amount),
-                "average_amount": float(result.avg_amount)
+                "total_amount": result.total_amount,
+                "average_amount": result.avg_amount
             })
         
         return monthly_data
     
-    def _get_type_breakdown(self, base_filters: List) -> Dict[str, Any]:
-        """Get transaction type breakdown."""
-        # Payment transactions
-        payment_filters = base_filters + [Transaction.type == TransactionType.PAYMENT]
-        payment_query = self.db.query(
-            func.count(Transaction.id).label('count'),
-            func.coalesce(func.sum(Transaction.amount), 0).label('amount')
-        ).filter(and_(*payment_filters))
-        
-        payment_result = payment_query.first()
-        
-        # Invoice transactions
-        invoice_filters = base_filters + [Transaction.type == TransactionType.INVOICE]
-        invoice_query = self.db.query(
-            func.count(Transaction.id).label('count'),
-            func.coalesce(func.sum(Transaction.amount), 0).label('amount')
-        ).filter(and_(*invoice_filters))
-        
-        invoice_result = invoice_query.first()
-        
-        return {
-            "payment": {
-                "count": payment_result.count if hasattr(payment_result, 'count') else 0,
-                "amount": float(payment_result.amount) if hasattr(payment_result, 'amount') else 0.0
-            },
-            "invoice": {
-                "count": invoice_result.count if hasattr(invoice_result, 'count') else 0,
-                "amount": float(invoice_result.amount) if hasattr(invoice_result, 'amount') else 0.0
-            }
-        }
-    
     def get_top_transactions(
         self,
         start_date: date,
         end_date: date,
         limit: int = 10,
-        status_filter: str = "all",
-        type_filter: str = "all"
+        status_filter: Optional[TransactionStatus] = None,
+        type_filter: Optional[TransactionType] = None
     ) -> List[Dict[str, Any]]:
         """
         Get top transactions by amount.
@@ -300,31 +300,19 @@ class TransactionAnalytics:
             start_date: Start date for analysis
             end_date: End date for analysis
             limit: Number of top transactions to return
-            status_filter: Status filter
-            type_filter: Type filter
+            status_filter: Status filter, or None for all
+            type_filter: Type filter, or None for all
             
         Returns:
             List of top transactions
         """
-        # Build base filters
-        base_filters = [
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date
-        ]
-        
-        if status_filter != "all":
-            status_enum = TransactionStatus(status_filter.lower())
-            base_filters.append(Transaction.status == status_enum)
-        
-        if type_filter != "all":
-            type_enum = TransactionType(type_filter.lower())
-            base_filters.append(Transaction.type == type_enum)
+        base_filters = _build_base_filters(start_date, end_date, status_filter, type_filter)
         
         # Query for top transactions
         top_query = self.db.query(
             Transaction.id,
             Transaction.user_id,
-            Transaction.amount,
+            cast(Transaction.amount, Float).label('amount'),
             Transaction.status,
             Transaction.type,
             Transaction.transaction_date
@@ -339,7 +327,7 @@ class TransactionAnalytics:
             top_transactions.append({
                 "transaction_id": result.id,
                 "user_id": result.user_id,
-                "amount": float(result.amount),
+                "amount": result.amount,
                 "status": result.status,
                 "type": result.type,
                 "transaction_date": result.transaction_date.isoformat()
@@ -0,0 +1,178 @@
+"""
+Redis-backed and HTTP caching for report responses.
+"""
+
+import functools
+import hashlib
+import json
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional outside docker
+    redis = None
+
+
+class RedisCache:
+    """
+    JSON cache on top of a pooled Redis connection.
+    
+    Attributes:
+        pool: Redis connection pool
+        client: Redis client bound to the pool
+    """
+    
+    def __init__(self, url: str, max_connections: int = 20):
+        self.pool = redis.ConnectionPool.from_url(url, max_connections=max_connections)
+        self.client = redis.Redis(connection_pool=self.pool)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss."""
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+    
+    def set(self, key: str, value: Any, expire: int) -> None:
+        """Store a JSON-serializable value for expire seconds."""
+        self.client.set(key, json.dumps(value), ex=expire)
+    
+    def delete_pattern(self, pattern: str) -> int:
+        """Delete all keys matching a glob pattern and return how many were removed."""
+        keys = list(self.client.scan_iter(match=pattern))
+        return self.client.delete(*keys) if keys else 0
+    
+    def close(self) -> None:
+        """Disconnect all pooled connections."""
+        self.pool.disconnect()
+
+
+_cache: Optional[RedisCache] = None
+
+
+def init_cache(url: Optional[str]) -> None:
+    """
+    Create the shared cache; caching stays disabled without a URL.
+    
+    Args:
+        url: Redis connection URL
+    """
+    global _cache
+    if not url:
+        return
+    if redis is None:
+        print("Redis URL configured but the redis package is not installed; caching disabled")
+        return
+    _cache = RedisCache(url)
+
+
+def get_cache() -> Optional[RedisCache]:
+    """Return the shared cache, or None when caching is disabled."""
+    return _cache
+
+
+def close_cache() -> None:
+    """Release the shared cache connection pool."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+
+def _build_key(prefix: str, name: str, params: Dict[str, Any]) -> str:
+    """Build a cache key from the endpoint name and its query parameters."""
+    key_params = {k: v for k, v in params.items() if not isinstance(v, (Session, Request))}
+    payload = json.dumps(key_params, sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    return f"{prefix}:{name}:{digest}"
+
+
+def cached(prefix: str, expire: int = 60) -> Callable:
+    """
+    Cache an endpoint's response keyed by its query parameters.
+    
+    Only keyword arguments are used for the key (FastAPI passes all
+    parameters by keyword); database sessions and requests are ignored. Cache errors
+    are reported and the endpoint is served uncached.
+    
+    Args:
+        prefix: Key prefix, used for pattern invalidation
+        expire: Time to live in seconds
+    
+    Returns:
+        Decorator for synchronous endpoint functions
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = _cache
+            if cache is None:
+                return func(*args, **kwargs)
+            
+            key = _build_key(prefix, func.__name__, kwargs)
+            try:
+                hit = cache.get(key)
+            except Exception as e:
+                print(f"Error reading cache: {e}")
+                hit = None
+            if hit is not None:
+                return hit
+            
+            result = jsonable_encoder(func(*args, **kwargs))
+            try:
+                cache.set(key, result, expire)
+            except Exception as e:
+                print(f"Error writing cache: {e}")
+            return result
+        
+        return wrapper
+    
+    return decorator
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def conditional_get(max_age: int = 60) -> Callable:
+    """
+    Add ETag and Cache-Control headers to an endpoint's JSON response.
+    
+    The decorated endpoint must accept a ``request`` argument. When the
+    client's If-None-Match matches the ETag of the body, an empty 304 is
+    returned instead.
+    
+    Args:
+        max_age: Seconds clients and proxies may reuse the response
+    
+    Returns:
+        Decorator for synchronous endpoint functions
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            request: Request = kwargs["request"]
+            response = ORJSONResponse(func(*args, **kwargs))
+            
+            etag = f'W/"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+            headers = {
+                "ETag": etag,
+                "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={2 * max_age}"
+            }
+            
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+            
+            response.headers.update(headers)
+            return response
+        
+        return wrapper
+    
+    return decorator
@@ -2,24 +2,63 @@
 Utility functions for loading and processing external data.
 """
 
-import pandas as pd
+import csv
+import os
+from functools import lru_cache
 from typing import Dict, Optional
 
+from fastapi import Request
+
+from app.config import settings
+
 def load_user_countries(csv_path: str) -> Dict[int, str]:
     """
     Load user-country mapping from CSV file.
     
+    The parsed mapping is cached per file modification time, so the file
+    is only re-read after it changes. Callers must not mutate the result.
+    
     Args:
         csv_path: Path to the CSV file
-        
+    
     Returns:
         Dictionary mapping user_id to country
     """
     try:
-        df = pd.read_csv(csv_path, sep=';')
-        # Convert to dictionary
-        user_countries = dict(zip(df['user_id'], df['country']))
-        return user_countries
+        mtime_ns = os.stat(csv_path).st_mtime_ns
+    except OSError as e:
+        print(f"Error loading user countries: {e}")
+        return {}
+    
+    return _load_user_countries_cached(csv_path, mtime_ns)
+
+
+@lru_cache(maxsize=4)
+def _load_user_countries_cached(csv_path: str, mtime_ns: int) -> Dict[int, str]:
+    """Parse the user-country CSV; cached by path and modification time."""
+    try:
+        with open(csv_path, newline='') as f:
+            reader = csv.DictReader(f, delimiter=';')
+            return {int(row['user_id']): row['country'] for row in reader}
     except Exception as e:
         print(f"Error loading user countries: {e}")
         return {}
+
+
+def get_user_countries(request: Request) -> Dict[int, str]:
+    """
+    Dependency to get the user-country mapping.
+    
+    Uses the mapping preloaded on app.state at startup and falls back to
+    loading it from disk when it is missing or empty.
+    
+    Args:
+        request: Incoming request
+        
+    Returns:
+        Dictionary mapping user_id to country
+    """
+    user_countries = getattr(request.app.state, "user_countries", None)
+    if not user_countries:
+        user_countries = load_user_countries(settings.user_countries_path)
+    return user_countries
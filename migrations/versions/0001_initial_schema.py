@@ -0,0 +1,285 @@
+"""Create transaction tables and daily stats triggers
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_initial_schema'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Enum values as of this revision
+TRANSACTION_STATUSES = ("successful", "failed")
+TRANSACTION_TYPES = ("payment", "invoice")
+
+# Indexes that the schema built with create_all before this revision put on
+# transactions; they are replaced by idx_transactions_date_status_type_amount
+BASELINE_TRANSACTION_INDEXES = (
+    "ix_transactions_id",
+    "ix_transactions_user_id",
+    "ix_transactions_status",
+    "ix_transactions_type",
+    "ix_transactions_transaction_date",
+    "idx_transactions_user_status",
+    "idx_transactions_date_status",
+    "idx_transactions_type_status",
+    "idx_transactions_amount_status",
+)
+
+PG_DAILY_STATS_DDL = (
+    """
+CREATE OR REPLACE FUNCTION recompute_daily_transaction_stats(
+    p_date date, p_status transaction_status, p_type transaction_type
+) RETURNS void AS $$
+BEGIN
+    DELETE FROM daily_transaction_stats
+    WHERE date = p_date AND status = p_status AND type = p_type;
+    
+    INSERT INTO daily_transaction_stats
+        (date, status, type, transaction_count, total_amount, min_amount, max_amount)
+    SELECT p_date, p_status, p_type, count(*), sum(amount), min(amount), max(amount)
+    FROM transactions
+    WHERE transaction_date >= p_date AND transaction_date < p_date + 1
+        AND status = p_status AND type = p_type
+    HAVING count(*) > 0;
+END;
+$$ LANGUAGE plpgsql
+""",
+    """
+CREATE OR REPLACE FUNCTION daily_transaction_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO daily_transaction_stats AS s
+            (date, status, type, transaction_count, total_amount, min_amount, max_amount)
+        VALUES (NEW.transaction_date::date, NEW.status, NEW.type, 1, NEW.amount, NEW.amount, NEW.amount)
+        ON CONFLICT (date, status, type) DO UPDATE SET
+            transaction_count = s.transaction_count + 1,
+            total_amount = s.total_amount + EXCLUDED.total_amount,
+            min_amount = LEAST(s.min_amount, EXCLUDED.min_amount),
+            max_amount = GREATEST(s.max_amount, EXCLUDED.max_amount);
+        RETURN NULL;
+    END IF;
+    
+    PERFORM recompute_daily_transaction_stats(OLD.transaction_date::date, OLD.status, OLD.type);
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM recompute_daily_transaction_stats(NEW.transaction_date::date, NEW.status, NEW.type);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""",
+    """
+CREATE OR REPLACE TRIGGER trg_transactions_daily_stats
+AFTER INSERT OR UPDATE OR DELETE ON transactions
+FOR EACH ROW EXECUTE FUNCTION daily_transaction_stats_trigger()
+""",
+)
+
+SQLITE_RECOMPUTE_DAILY_STATS = """
+    DELETE FROM daily_transaction_stats
+    WHERE date = date({row}.transaction_date) AND status = {row}.status AND type = {row}.type;
+    INSERT INTO daily_transaction_stats
+        (date, status, type, transaction_count, total_amount, min_amount, max_amount)
+    SELECT date({row}.transaction_date), {row}.status, {row}.type,
+        count(*), sum(amount), min(amount), max(amount)
+    FROM transactions
+    WHERE transaction_date >= date({row}.transaction_date)
+        AND transaction_date < date({row}.transaction_date, '+1 day')
+        AND status = {row}.status AND type = {row}.type
+    HAVING count(*) > 0;
+"""
+
+SQLITE_DAILY_STATS_DDL = (
+    """
+CREATE TRIGGER IF NOT EXISTS trg_transactions_daily_stats_insert
+AFTER INSERT ON transactions
+BEGIN
+    INSERT INTO daily_transaction_stats
+        (date, status, type, transaction_count, total_amount, min_amount, max_amount)
+    VALUES (date(NEW.transaction_date), NEW.status, NEW.type, 1, NEW.amount, NEW.amount, NEW.amount)
+    ON CONFLICT (date, status, type) DO UPDATE SET
+        transaction_count = transaction_count + 1,
+        total_amount = total_amount + excluded.total_amount,
+        min_amount = min(min_amount, excluded.min_amount),
+        max_amount = max(max_amount, excluded.max_amount);
+END
+""",
+    f"""
+CREATE TRIGGER IF NOT EXISTS trg_transactions_daily_stats_update
+AFTER UPDATE ON transactions
+BEGIN
+{SQLITE_RECOMPUTE_DAILY_STATS.format(row="OLD")}
+{SQLITE_RECOMPUTE_DAILY_STATS.format(row="NEW")}
+END
+""",
+    f"""
+CREATE TRIGGER IF NOT EXISTS trg_transactions_daily_stats_delete
+AFTER DELETE ON transactions
+BEGIN
+{SQLITE_RECOMPUTE_DAILY_STATS.format(row="OLD")}
+END
+""",
+)
+
+DAILY_STATS_DDL = {
+    "postgresql": PG_DAILY_STATS_DDL,
+    "sqlite": SQLITE_DAILY_STATS_DDL,
+}
+
+# The day expression must match the one the triggers use
+DAILY_STATS_BACKFILL = """
+INSERT INTO daily_transaction_stats
+    (date, status, type, transaction_count, total_amount, min_amount, max_amount)
+SELECT {day}, status, type, count(*), sum(amount), min(amount), max(amount)
+FROM transactions
+GROUP BY {day}, status, type
+"""
+
+DAILY_STATS_DAY = {
+    "postgresql": "transaction_date::date",
+    "sqlite": "date(transaction_date)",
+}
+
+
+def _enum_type(dialect: str, name: str, values: Sequence[str]) -> sa.types.TypeEngine:
+    """Column type for an enum; PostgreSQL types are created separately, once."""
+    if dialect == "postgresql":
+        return postgresql.ENUM(*values, name=name, create_type=False)
+    return sa.Enum(*values, name=name)
+
+
+def _create_users_and_transactions(status_type, type_type) -> None:
+    """Create users and transactions on an empty database."""
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("first_name", sa.String(length=100), nullable=False),
+        sa.Column("last_name", sa.String(length=100), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("idx_users_email_active", "users", ["email", "is_active"])
+    op.create_index("idx_users_created_at", "users", ["created_at"])
+    
+    op.create_table(
+        "transactions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column("status", status_type, nullable=False),
+        sa.Column("type", type_type, nullable=False),
+        sa.Column("transaction_date", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def _upgrade_baseline_transactions(dialect: str, existing_indexes: set) -> None:
+    """
+    Bring a transactions table built by the earlier create_all up to this revision.
+    
+    Args:
+        dialect: Name of the database dialect
+        existing_indexes: Index names currently on transactions
+    """
+    for name in BASELINE_TRANSACTION_INDEXES:
+        if name in existing_indexes:
+            op.drop_index(name, table_name="transactions")
+    
+    # status and type were VARCHAR(20). On SQLite the enum columns are
+    # VARCHAR as well, so only PostgreSQL needs the native types
+    if dialect == "postgresql":
+        for column, enum_name in (("status", "transaction_status"), ("type", "transaction_type")):
+            op.execute(
+                f"ALTER TABLE transactions ALTER COLUMN {column} "
+                f"TYPE {enum_name} USING {column}::text::{enum_name}"
+            )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    if dialect not in DAILY_STATS_DDL:
+        raise NotImplementedError(f"Daily stats triggers are not available for {dialect}")
+    
+    if dialect == "postgresql":
+        postgresql.ENUM(*TRANSACTION_STATUSES, name="transaction_status").create(bind, checkfirst=True)
+        postgresql.ENUM(*TRANSACTION_TYPES, name="transaction_type").create(bind, checkfirst=True)
+    status_type = _enum_type(dialect, "transaction_status", TRANSACTION_STATUSES)
+    type_type = _enum_type(dialect, "transaction_type", TRANSACTION_TYPES)
+    
+    inspector = sa.inspect(bind)
+    if inspector.has_table("transactions"):
+        existing_indexes = {index["name"] for index in inspector.get_indexes("transactions")}
+        _upgrade_baseline_transactions(dialect, existing_indexes)
+    else:
+        _create_users_and_transactions(status_type, type_type)
+        existing_indexes = set()
+    
+    if "idx_transactions_user_date" not in existing_indexes:
+        op.create_index("idx_transactions_user_date", "transactions", ["user_id", "transaction_date"])
+    if "idx_transactions_date_status_type_amount" not in existing_indexes:
+        op.create_index(
+            "idx_transactions_date_status_type_amount",
+            "transactions",
+            ["transaction_date", "status", "type", "amount"],
+            postgresql_include=["user_id"],
+        )
+    
+    if not inspector.has_table("daily_transaction_stats"):
+        op.create_table(
+            "daily_transaction_stats",
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("status", status_type, nullable=False),
+            sa.Column("type", type_type, nullable=False),
+            sa.Column("transaction_count", sa.Integer(), nullable=False),
+            sa.Column("total_amount", sa.Numeric(precision=16, scale=2), nullable=False),
+            sa.Column("min_amount", sa.Numeric(precision=10, scale=2), nullable=False),
+            sa.Column("max_amount", sa.Numeric(precision=10, scale=2), nullable=False),
+            sa.PrimaryKeyConstraint("date", "status", "type"),
+        )
+    for ddl in DAILY_STATS_DDL[dialect]:
+        op.execute(ddl)
+    
+    # Backfill rows written before the triggers existed
+    op.execute("DELETE FROM daily_transaction_stats")
+    op.execute(DAILY_STATS_BACKFILL.format(day=DAILY_STATS_DAY[dialect]))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS trg_transactions_daily_stats ON transactions")
+        op.execute("DROP FUNCTION IF EXISTS daily_transaction_stats_trigger()")
+        op.execute(
+            "DROP FUNCTION IF EXISTS recompute_daily_transaction_stats(date, transaction_status, transaction_type)"
+        )
+    else:
+        for operation in ("insert", "update", "delete"):
+            op.execute(f"DROP TRIGGER IF EXISTS trg_transactions_daily_stats_{operation}")
+    
+    op.drop_table("daily_transaction_stats")
+    op.drop_table("transactions")
+    op.drop_table("users")
+    
+    if bind.dialect.name == "postgresql":
+        sa.Enum(name="transaction_type").drop(bind, checkfirst=True)
+        sa.Enum(name="transaction_status").drop(bind, checkfirst=True)
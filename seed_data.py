@@ -8,46 +8,66 @@ Creates:
 - Balanced status and type distributions
 """
 
-import random
+from collections import Counter
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import List
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 from faker import Faker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert, select
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
 from app.models import User, Transaction, TransactionType, TransactionStatus
+from app.utils.cache import close_cache, get_cache, init_cache
 
-# Initialize Faker
+# Fixed seed so every run produces the same data set
+RANDOM_SEED = 0
+
+# Initialize Faker and the NumPy generator
+Faker.seed(RANDOM_SEED)
 fake = Faker()
+rng = np.random.default_rng(RANDOM_SEED)
+
+# Number of distinct first and last names sampled for mock users
+NAME_POOL_SIZE = 200
 
 # Database setup
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(bind=engine)
 
 
-def create_mock_users(count: int = 100) -> List[User]:
-    """Create mock users with realistic data."""
-    users = []
-    
-    for i in range(1, count + 1):
-        user = User(
-            first_name=fake.first_name(),
-            last_name=fake.last_name(),
-            email=fake.email(),
-            is_active=random.choice([True, True, True, False])  # 75% active
-        )
-        users.append(user)
+def create_mock_users(count: int = 100) -> List[Dict[str, Any]]:
+    """Create mock user rows with realistic data."""
+    # Faker is slow per call, so build small name pools once and sample them
+    first_names = [fake.first_name() for _ in range(NAME_POOL_SIZE)]
+    last_names = [fake.last_name() for _ in range(NAME_POOL_SIZE)]
+    first_idx = rng.integers(0, NAME_POOL_SIZE, size=count).tolist()
+    last_idx = rng.integers(0, NAME_POOL_SIZE, size=count).tolist()
+    actives = (rng.random(count) >= 0.25).tolist()  # 75% active
     
-    return users
+    return [
+        {
+            "first_name": first_names[first_idx[i]],
+            "last_name": last_names[last_idx[i]],
+            "email": f"user{i + 1}@example.com",  # unique by construction
+            "is_active": actives[i]
+        }
+        for i in range(count)
+    ]
 
 
-def create_mock_transactions(users: List[User], count: int = 10000) -> List[Transaction]:
-    """Create mock transactions distributed over the last 2 years."""
-    transactions = []
+def create_mock_transactions(
+    user_ids: List[int], count: int = 10000
+) -> Tuple[List[Dict[str, Any]], np.ndarray, np.ndarray]:
+    """
+    Create mock transaction rows distributed over the last 2 years.
     
+    Returns:
+        The rows, plus the drawn amount_cents and days_offsets arrays so
+        statistics can be reduced without walking the rows
+    """
     # Calculate date range (last 2 years)
     end_date = datetime.now()
     start_date = end_date - timedelta(days=730)  # 2 years
@@ -60,31 +80,38 @@ def create_mock_transactions(users: List[User], count: int = 10000) -> List[Tran
     status_weights = [0.7, 0.3]
     type_weights = [0.6, 0.4]
     
-    for i in range(count):
-        # Random user
-        user = random.choice(users)
-        
-        # Random date within range
-        days_offset = random.randint(0, 730)
-        transaction_date = start_date + timedelta(days=days_offset)
-        
-        # Random amount (1 to 1000)
-        amount = Decimal(str(round(random.uniform(1.0, 1000.0), 2)))
-        
-        # Weighted random status and type
-        status = random.choices(statuses, weights=status_weights)[0]
-        trans_type = random.choices(types, weights=type_weights)[0]
-        
-        transaction = Transaction(
-            user_id=user.id,
-            amount=amount,
-            status=status,
-            type=trans_type,
-            transaction_date=transaction_date
-        )
-        transactions.append(transaction)
+    # Draw every column in one vectorized call instead of per row
+    user_idx = rng.integers(0, len(user_ids), size=count)
+    days_offsets = rng.integers(0, 731, size=count)  # 0 to 730 inclusive
+    amount_cents = rng.integers(100, 100_001, size=count)  # 1.00 to 1000.00
+    status_idx = rng.choice(len(statuses), size=count, p=status_weights)
+    type_idx = rng.choice(len(types), size=count, p=type_weights)
     
-    return transactions
+    rows = [
+        {
+            "user_id": user_ids[u],
+            "amount": Decimal(a).scaleb(-2),
+            "status": statuses[s],
+            "type": types[t],
+            "transaction_date": start_date + timedelta(days=int(d))
+        }
+        for u, d, a, s, t in zip(
+            user_idx.tolist(), days_offsets.tolist(), amount_cents.tolist(),
+            status_idx.tolist(), type_idx.tolist()
+        )
+    ]
+    return rows, amount_cents, days_offsets
+
+
+def invalidate_report_cache():
+    """Drop cached report responses after the transaction data changes."""
+    init_cache(settings.redis_url)
+    try:
+        cache = get_cache()
+        if cache is not None:
+            print(f"Invalidated {cache.delete_pattern('report:*')} cached reports")
+    finally:
+        close_cache()
 
 
 def seed_database():
@@ -104,31 +131,40 @@ def seed_database():
         # Create users
         print("Creating users...")
         users = create_mock_users(120)  # Create 120 users
-        db.add_all(users)
+        # Core executemany inserts in batches without per-object bookkeeping
+        db.execute(insert(User), users)
         db.commit()
         
-        # Refresh to get IDs
-        for user in users:
-            db.refresh(user)
+        # Fetch generated IDs in one query
+        user_ids = db.scalars(select(User.id)).all()
         
-        print(f"Created {len(users)} users")
+        print(f"Created {len(user_ids)} users")
         
         # Create transactions
         print("Creating transactions...")
-        transactions = create_mock_transactions(users, 12000)  # Create 12,000 transactions
-        db.add_all(transactions)
+        transactions, amount_cents, days_offsets = create_mock_transactions(user_ids, 12000)  # Create 12,000 transactions
+        db.execute(insert(Transaction), transactions)
         db.commit()
         
         print(f"Created {len(transactions)} transactions")
         
-        # Print some statistics
-        successful_count = len([t for t in transactions if t.status == TransactionStatus.SUCCESSFUL])
-        failed_count = len([t for t in transactions if t.status == TransactionStatus.FAILED])
-        payment_count = len([t for t in transactions if t.type == TransactionType.PAYMENT])
-        invoice_count = len([t for t in transactions if t.type == TransactionType.INVOICE])
+        # Cached reports were computed from the old data
+        invalidate_report_cache()
+        
+        # Print some statistics; amounts and dates come from NumPy
+        # reductions over the drawn arrays
+        status_counts = Counter(t["status"] for t in transactions)
+        type_counts = Counter(t["type"] for t in transactions)
+        first_date = transactions[int(days_offsets.argmin())]["transaction_date"]
+        last_date = transactions[int(days_offsets.argmax())]["transaction_date"]
+        
+        successful_count = status_counts[TransactionStatus.SUCCESSFUL]
+        failed_count = status_counts[TransactionStatus.FAILED]
+        payment_count = type_counts[TransactionType.PAYMENT]
+        invoice_count = type_counts[TransactionType.INVOICE]
         
         print("\n=== Database Statistics ===")
-        print(f"Total Users: {len(users)}")
+        print(f"Total Users: {len(user_ids)}")
         print(f"Total Transactions: {len(transactions)}")
         print(f"Successful Transactions: {successful_count} ({successful_count/len(transactions)*100:.1f}%)")
         print(f"Failed Transactions: {failed_count} ({failed_count/len(transactions)*100:.1f}%)")
@@ -136,13 +172,11 @@ def seed_database():
         print(f"Invoice Transactions: {invoice_count} ({invoice_count/len(transactions)*100:.1f}%)")
         
         # Date range
-        dates = [t.transaction_date for t in transactions]
-        print(f"Date Range: {min(dates).date()} to {max(dates).date()}")
+        print(f"Date Range: {first_date.date()} to {last_date.date()}")
         
         # Amount range
-        amounts = [float(t.amount) for t in transactions]
-        print(f"Amount Range: ${min(amounts):.2f} to ${max(amounts):.2f}")
-        print(f"Average Amount: ${sum(amounts)/len(amounts):.2f}")
+        print(f"Amount Range: ${amount_cents.min() / 100:.2f} to ${amount_cents.max() / 100:.2f}")
+        print(f"Average Amount: ${amount_cents.mean() / 100:.2f}")
         
         print("\nDatabase seeding completed successfully!")
         
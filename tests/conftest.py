@@ -2,17 +2,156 @@
 Pytest configuration and shared fixtures.
 """
 
+import inspect
 import pytest
+from contextlib import contextmanager
 import tempfile
 import os
 from datetime import date, timedelta
-from sqlalchemy import create_engine
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert, select
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.database import get_db, Base
+from app.main import app
 from app.models import User, Transaction, TransactionStatus, TransactionType
 
 
+@pytest.fixture(scope="session")
+def engine():
+    """Create the in-memory database engine shared by the API tests."""
+    # StaticPool shares the single in-memory connection with the
+    # TestClient's worker threads so every session sees the same database
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    
+    # The schema is created once per session; fixtures only clear rows
+    Base.metadata.create_all(bind=engine)
+    
+    yield engine
+    
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def clear_tables(engine):
+    """Return a function that deletes all rows from the shared database."""
+    def clear():
+        with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+    
+    return clear
+
+
+@pytest.fixture(scope="session")
+def seed_tables(engine, clear_tables):
+    """
+    Return a context manager that seeds users and transactions.
+    
+    Both inserts run as Core executemany calls in one database transaction
+    and every row is deleted again on exit, so module-scoped data fixtures
+    only supply their rows.
+    
+    Args (of the returned context manager):
+        user_rows: User column values; IDs are read back unless given
+        build_transaction_rows: Callable turning the user IDs into
+            transaction column values
+    
+    Yields:
+        The inserted user IDs
+    """
+    @contextmanager
+    def seed(user_rows, build_transaction_rows):
+        try:
+            with engine.begin() as conn:
+                conn.execute(User.__table__.insert(), user_rows)
+                if all("id" in row for row in user_rows):
+                    user_ids = [row["id"] for row in user_rows]
+                else:
+                    user_ids = conn.execute(select(User.id).order_by(User.id)).scalars().all()
+                conn.execute(Transaction.__table__.insert(), build_transaction_rows(user_ids))
+            
+            yield user_ids
+        finally:
+            clear_tables()
+    
+    return seed
+
+
+@pytest.fixture(scope="session")
+def session_factory(engine):
+    """Create the session factory used by the get_db override."""
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def override_db(session_factory):
+    """Point the database dependency at the test engine for the whole session."""
+    def override_get_db():
+        """Override database dependency for testing."""
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    
+    yield
+    
+    if previous is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = previous
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Create a test client for the application."""
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def call_endpoint():
+    """
+    Return a function that calls a route handler directly.
+    
+    Used by tests of validation branches that fail before the database is
+    touched, skipping the ASGI stack. Decorators are unwrapped, omitted
+    query parameters take their declared defaults and dependencies
+    default to None.
+    """
+    def call(endpoint, **kwargs):
+        func = inspect.unwrap(endpoint)
+        for name, param in inspect.signature(func).parameters.items():
+            if name not in kwargs:
+                kwargs[name] = getattr(param.default, "default", None)
+        return func(**kwargs)
+    
+    return call
+
+
+@pytest.fixture(scope="function")
+def rollback_transaction(engine, session_factory):
+    """Run a test inside a transaction that is rolled back afterwards."""
+    connection = engine.connect()
+    transaction = connection.begin()
+    session_factory.configure(bind=connection)
+    try:
+        yield connection
+    finally:
+        session_factory.configure(bind=engine)
+        transaction.rollback()
+        connection.close()
+
+
 @pytest.fixture(scope="session")
 def test_db():
     """Create test database for the session."""
@@ -20,6 +159,15 @@ def test_db():
     db_fd, db_path = tempfile.mkstemp()
     engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
     
+    # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs work with pysqlite
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
     Base.metadata.create_all(bind=engine)
     
     yield engine
@@ -31,72 +179,69 @@ def test_db():
 
 @pytest.fixture(scope="function")
 def db_session(test_db):
-    """Create database session for each test."""
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_db)
+    """Create database session for each test, rolled back afterwards."""
+    connection = test_db.connect()
+    transaction = connection.begin()
+    
+    # Commits inside a test only release SAVEPOINTs; rolling back the outer
+    # transaction undoes everything, so fixtures need no cleanup queries.
+    # Attributes stay loaded after commit, so objects need no refresh.
+    TestingSessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+        bind=connection,
+        join_transaction_mode="create_savepoint"
+    )
     
     session = TestingSessionLocal()
     try:
         yield session
     finally:
         session.close()
+        transaction.rollback()
+        connection.close()
 
 
 @pytest.fixture(scope="function")
 def sample_users(db_session):
     """Create sample users for testing."""
-    users = []
-    for i in range(5):
-        user = User(
-            first_name=f"Test{i}",
-            last_name=f"User{i}",
-            email=f"test{i}@example.com"
-        )
-        users.append(user)
-    
-    db_session.add_all(users)
-    db_session.commit()
+    user_rows = [
+        {
+            "first_name": f"Test{i}",
+            "last_name": f"User{i}",
+            "email": f"test{i}@example.com"
+        }
+        for i in range(5)
+    ]
     
-    # Refresh to get IDs
-    for user in users:
-        db_session.refresh(user)
-    
-    yield users
-    
-    # Cleanup
-    for user in users:
-        db_session.delete(user)
+    # One bulk INSERT ... RETURNING instead of per-object inserts
+    users = db_session.scalars(insert(User).returning(User), user_rows).all()
     db_session.commit()
+    
+    return users
 
 
 @pytest.fixture(scope="function")
 def sample_transactions(db_session, sample_users):
     """Create sample transactions for testing."""
-    transactions = []
     base_date = date.today() - timedelta(days=30)
     
-    for i in range(50):
-        transaction = Transaction(
-            user_id=sample_users[i % len(sample_users)].id,
-            amount=50.0 + (i % 100),
-            status=TransactionStatus.SUCCESSFUL if i % 4 != 0 else TransactionStatus.FAILED,
-            type=TransactionType.PAYMENT if i % 2 == 0 else TransactionType.INVOICE,
-            transaction_date=base_date + timedelta(days=i % 30)
-        )
-        transactions.append(transaction)
-    
-    db_session.add_all(transactions)
-    db_session.commit()
-    
-    # Refresh to get IDs
-    for transaction in transactions:
-        db_session.refresh(transaction)
+    transaction_rows = [
+        {
+            "user_id": sample_users[i % len(sample_users)].id,
+            "amount": 50.0 + (i % 100),
+            "status": TransactionStatus.SUCCESSFUL if i % 4 != 0 else TransactionStatus.FAILED,
+            "type": TransactionType.PAYMENT if i % 2 == 0 else TransactionType.INVOICE,
+            "transaction_date": base_date + timedelta(days=i % 30)
+        }
+        for i in range(50)
+    ]
     
-    yield transactions
-    
-    # Cleanup
-    for transaction in transactions:
-        db_session.delete(transaction)
+    transactions = db_session.scalars(insert(Transaction).returning(Transaction), transaction_rows).all()
     db_session.commit()
+    
+    return transactions
 
 
 @pytest.fixture(scope="function")
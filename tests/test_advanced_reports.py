@@ -3,109 +3,77 @@ Advanced tests for the enhanced reports API endpoints.
 """
 
 import pytest
+import numpy as np
 from datetime import date, timedelta
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from fastapi import HTTPException
 
-from app.main import app
-from app.database import get_db, Base
-from app.models import User, Transaction, TransactionStatus, TransactionType
+from app.models import TransactionStatus, TransactionType
+from app.routers.reports import get_transaction_report
 
-# Test database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_advanced.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Every test runs in a transaction that is rolled back afterwards
+pytestmark = pytest.mark.usefixtures("rollback_transaction")
 
 
-def override_get_db():
-    """Override database dependency for testing."""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-app.dependency_overrides[get_db] = override_get_db
-
-# Create test client
-client = TestClient(app)
-
-
-@pytest.fixture(scope="function")
-def setup_advanced_test_data():
-    """Setup comprehensive test data for advanced testing."""
-    # Create tables
-    Base.metadata.create_all(bind=engine)
+@pytest.fixture(scope="module")
+def setup_advanced_test_data(request, seed_tables):
+    """
+    Setup comprehensive test data for advanced testing, created once per module.
     
-    db = TestingSessionLocal()
+    Structural tests use a small dataset; tests that need volume request
+    more rows through indirect parametrization. Yields the number of
+    transactions inserted.
+    """
+    size = getattr(request, "param", 20)
     
-    try:
-        # Create test users
-        users = []
-        for i in range(10):
-            user = User(
-                first_name=f"Advanced{i}",
-                last_name=f"User{i}",
-                email=f"advanced{i}@example.com"
-            )
-            users.append(user)
-        
-        db.add_all(users)
-        db.commit()
-        
-        # Refresh to get IDs
-        for user in users:
-            db.refresh(user)
-        
-        # Create diverse test transactions over 3 months
+    user_rows = [
+        {
+            "first_name": f"Advanced{i}",
+            "last_name": f"User{i}",
+            "email": f"advanced{i}@example.com"
+        }
+        for i in range(10)
+    ]
+    
+    def build_transaction_rows(user_ids):
+        # Diverse transactions spread over 3 months, computing each column
+        # for all rows at once
         base_date = date.today() - timedelta(days=90)
-        transactions = []
-        
-        for i in range(500):
-            # Vary dates across 3 months
-            days_offset = i % 90
-            transaction_date = base_date + timedelta(days=days_offset)
-            
-            # Create varied amounts
-            if i % 10 == 0:
-                amount = 1000.0  # High value transactions
-            elif i % 5 == 0:
-                amount = 500.0   # Medium value
-            else:
-                amount = float(10 + (i % 100))  # Regular transactions
-            
-            # Balanced status distribution
-            status = TransactionStatus.SUCCESSFUL if i % 3 != 0 else TransactionStatus.FAILED
-            
-            # Balanced type distribution
-            trans_type = TransactionType.PAYMENT if i % 2 == 0 else TransactionType.INVOICE
-            
-            transaction = Transaction(
-                user_id=users[i % len(users)].id,
-                amount=amount,
-                status=status,
-                type=trans_type,
-                transaction_date=transaction_date
-            )
-            transactions.append(transaction)
-        
-        db.add_all(transactions)
-        db.commit()
-        
-        yield
-        
-    finally:
-        # Cleanup
-        db.close()
-        Base.metadata.drop_all(bind=engine)
+        i = np.arange(size)
+        
+        days_offsets = i * 90 // size
+        amounts = np.where(
+            i % 10 == 0, 1000.0,  # High value transactions
+            np.where(i % 5 == 0, 500.0, 10.0 + (i % 100))  # Medium value, regular
+        )
+        # Balanced status and type distributions
+        successful = i % 3 != 0
+        payment = i % 2 == 0
+        
+        statuses = [TransactionStatus.FAILED, TransactionStatus.SUCCESSFUL]
+        types = [TransactionType.INVOICE, TransactionType.PAYMENT]
+        
+        return [
+            {
+                "user_id": user_ids[n % len(user_ids)],
+                "amount": amount,
+                "status": statuses[s],
+                "type": types[t],
+                "transaction_date": base_date + timedelta(days=d)
+            }
+            for n, (d, amount, s, t) in enumerate(zip(
+                days_offsets.tolist(), amounts.tolist(),
+                successful.tolist(), payment.tolist()
+            ))
+        ]
+    
+    with seed_tables(user_rows, build_transaction_rows):
+        yield size
 
 
 class TestAdvancedReportsAPI:
     """Test class for advanced reports API features."""
     
-    def test_report_with_all_features(self, setup_advanced_test_data):
+    def test_report_with_all_features(self, client, setup_advanced_test_data):
         """Test report endpoint with all advanced features enabled."""
         response = client.get("/report/?include_avg=true&include_min=true&include_max=true&include_daily_shift=true&include_monthly_comparison=true&include_top_transactions=true")
         assert response.status_code == 200
@@ -181,7 +149,57 @@ class TestAdvancedReportsAPI:
             if len(top_transactions) > 1:
                 assert top_transactions[0]["amount"] >= top_transactions[1]["amount"]
     
-    def test_summary_endpoint(self, setup_advanced_test_data):
+    def test_daily_breakdown_percent_change(self, client, setup_advanced_test_data):
+        """Test that daily percentage changes are relative to the previous day."""
+        start_date = (date.today() - timedelta(days=90)).isoformat()
+        end_date = date.today().isoformat()
+        
+        response = client.get(f"/report/?start_date={start_date}&end_date={end_date}&include_daily_shift=true")
+        assert response.status_code == 200
+        
+        daily_data = response.json()["daily_breakdown"]
+        assert len(daily_data) > 1
+        
+        # First day has nothing to compare against
+        assert daily_data[0]["amount_change_percent"] is None
+        assert daily_data[0]["count_change_percent"] is None
+        
+        for previous, current in zip(daily_data, daily_data[1:]):
+            expected_amount = (current["total_amount"] - previous["total_amount"]) / previous["total_amount"] * 100
+            expected_count = (current["transaction_count"] - previous["transaction_count"]) / previous["transaction_count"] * 100
+            assert current["amount_change_percent"] == pytest.approx(expected_amount, abs=0.01)
+            assert current["count_change_percent"] == pytest.approx(expected_count, abs=0.01)
+    
+    def test_monthly_comparison_grouping(self, client, setup_advanced_test_data):
+        """Test that monthly comparison has one ordered row per calendar month."""
+        start_date = (date.today() - timedelta(days=90)).isoformat()
+        end_date = date.today().isoformat()
+        
+        response = client.get(f"/report/?start_date={start_date}&end_date={end_date}&include_monthly_comparison=true")
+        assert response.status_code == 200
+        
+        monthly_data = response.json()["monthly_comparison"]
+        months = [(m["year"], m["month"]) for m in monthly_data]
+        assert months == sorted(set(months))
+        
+        # Defaults to successful transactions: every i % 3 != 0 of the dataset
+        expected = sum(1 for i in range(setup_advanced_test_data) if i % 3 != 0)
+        assert sum(m["transaction_count"] for m in monthly_data) == expected
+    
+    def test_large_report_is_compressed(self, client, setup_advanced_test_data):
+        """Test that large responses are gzip-compressed when accepted."""
+        start_date = (date.today() - timedelta(days=90)).isoformat()
+        end_date = date.today().isoformat()
+        
+        response = client.get(
+            f"/report/?start_date={start_date}&end_date={end_date}&include_daily_shift=true",
+            headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "daily_breakdown" in response.json()
+    
+    def test_summary_endpoint(self, client, setup_advanced_test_data):
         """Test the summary endpoint."""
         response = client.get("/report/summary?days=30")
         assert response.status_code == 200
@@ -211,7 +229,7 @@ class TestAdvancedReportsAPI:
         assert isinstance(summary["success_rate"], (int, float))
         assert isinstance(summary["average_amount"], (int, float))
     
-    def test_summary_endpoint_custom_days(self, setup_advanced_test_data):
+    def test_summary_endpoint_custom_days(self, client, setup_advanced_test_data):
         """Test summary endpoint with custom day range."""
         response = client.get("/report/summary?days=7")
         assert response.status_code == 200
@@ -219,7 +237,7 @@ class TestAdvancedReportsAPI:
         data = response.json()
         assert data["period"]["days"] == 7
     
-    def test_summary_endpoint_invalid_days(self, setup_advanced_test_data):
+    def test_summary_endpoint_invalid_days(self, client):
         """Test summary endpoint with invalid day range."""
         # Test days too small
         response = client.get("/report/summary?days=0")
@@ -229,29 +247,7 @@ class TestAdvancedReportsAPI:
         response = client.get("/report/summary?days=400")
         assert response.status_code == 422  # Validation error
     
-    def test_report_performance_optimization(self, setup_advanced_test_data):
-        """Test that the optimized queries work correctly."""
-        start_date = (date.today() - timedelta(days=30)).isoformat()
-        end_date = date.today().isoformat()
-        
-        response = client.get(f"/report/?start_date={start_date}&end_date={end_date}&include_avg=true&include_min=true&include_max=true")
-        assert response.status_code == 200
-        
-        data = response.json()
-        metrics = data["metrics"]
-        
-        # Verify all metrics are calculated correctly
-        assert metrics["total_transactions"] > 0
-        assert metrics["total_amount"] > 0
-        assert metrics["average_amount"] > 0
-        assert metrics["minimum_amount"] > 0
-        assert metrics["maximum_amount"] > 0
-        
-        # Verify logical consistency
-        assert metrics["minimum_amount"] <= metrics["average_amount"] <= metrics["maximum_amount"]
-        assert metrics["successful_transactions"] + metrics["failed_transactions"] == metrics["total_transactions"]
-    
-    def test_report_with_specific_filters(self, setup_advanced_test_data):
+    def test_report_with_specific_filters(self, client, setup_advanced_test_data):
         """Test report endpoint with specific status and type filters."""
         response = client.get("/report/?status=successful&type=payment&include_daily_shift=true")
         assert response.status_code == 200
@@ -267,18 +263,19 @@ class TestAdvancedReportsAPI:
         assert metrics["successful_transactions"] == metrics["total_transactions"]
         assert metrics["failed_transactions"] == 0
     
-    def test_report_date_range_validation(self, setup_advanced_test_data):
+    def test_report_date_range_validation(self, call_endpoint):
         """Test date range validation."""
-        start_date = date.today().isoformat()
-        end_date = (date.today() - timedelta(days=1)).isoformat()
-        
-        response = client.get(f"/report/?start_date={start_date}&end_date={end_date}")
-        assert response.status_code == 400
+        with pytest.raises(HTTPException) as exc_info:
+            call_endpoint(
+                get_transaction_report,
+                start_date=date.today(),
+                end_date=date.today() - timedelta(days=1)
+            )
         
-        data = response.json()
-        assert "Start date cannot be after end date" in data["detail"]
+        assert exc_info.value.status_code == 400
+        assert "Start date cannot be after end date" in exc_info.value.detail
     
-    def test_report_empty_result_handling(self, setup_advanced_test_data):
+    def test_report_empty_result_handling(self, client, setup_advanced_test_data):
         """Test handling of empty results."""
         # Use a date range far in the future
         future_date = (date.today() + timedelta(days=365)).isoformat()
@@ -294,3 +291,29 @@ class TestAdvancedReportsAPI:
         assert metrics["total_transactions"] == 0
         assert metrics["total_amount"] == 0
         assert metrics["success_rate"] == 0
+    
+    @pytest.mark.parametrize("setup_advanced_test_data", [500], indirect=True)
+    def test_report_performance_optimization(self, client, setup_advanced_test_data):
+        """Test that the optimized queries work correctly."""
+        start_date = (date.today() - timedelta(days=30)).isoformat()
+        end_date = date.today().isoformat()
+        
+        response = client.get(f"/report/?start_date={start_date}&end_date={end_date}&include_avg=true&include_min=true&include_max=true")
+        assert response.status_code == 200
+        
+        data = response.json()
+        metrics = data["metrics"]
+        
+        # Verify all metrics are calculated correctly
+        assert metrics["total_transactions"] > 0
+        assert metrics["total_amount"] > 0
+        assert metrics["average_amount"] > 0
+        assert metrics["minimum_amount"] > 0
+        assert metrics["maximum_amount"] > 0
+        
+        # Verify logical consistency
+        assert metrics["minimum_amount"] <= metrics["average_amount"] <= metrics["maximum_amount"]
+        assert metrics["successful_transactions"] + metrics["failed_transactions"] == metrics["total_transactions"]
+        type_breakdown = metrics["type_breakdown"]
+        assert type_breakdown["payment"]["count"] + type_breakdown["invoice"]["count"] == metrics["total_transactions"]
+        assert type_breakdown["payment"]["amount"] + type_breakdown["invoice"]["amount"] == pytest.approx(metrics["total_amount"])
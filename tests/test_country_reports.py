@@ -4,136 +4,76 @@ Tests for the country-based reports API endpoints.
 
 import pytest
 from datetime import date, timedelta
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-import pandas as pd
-import tempfile
-import os
+from fastapi import HTTPException
+from types import SimpleNamespace
 
-from app.main import app
-from app.database import get_db, Base
-from app.models import User, Transaction, TransactionStatus, TransactionType
+from app.models import TransactionStatus, TransactionType
+from app.routers.country_reports import _aggregate_by_country, get_country_report
 
-# Test database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_country.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Every test runs in a transaction that is rolled back afterwards
+pytestmark = pytest.mark.usefixtures("rollback_transaction")
 
 
-def override_get_db():
-    """Override database dependency for testing."""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-app.dependency_overrides[get_db] = override_get_db
-
-# Create test client
-client = TestClient(app)
-
-
-@pytest.fixture(scope="function")
-def setup_country_test_data():
-    """Setup test data for country reports testing."""
-    # Create tables
-    Base.metadata.create_all(bind=engine)
+@pytest.fixture(scope="module")
+def setup_country_test_data(request, seed_tables):
+    """
+    Setup test data for country reports testing, created once per module.
     
-    db = TestingSessionLocal()
+    The dataset is small by default; tests that need volume request more
+    rows through indirect parametrization.
+    """
+    size = getattr(request, "param", 20)
     
-    try:
-        # Create test users
-        users = []
-        for i in range(20):
-            user = User(
-                first_name=f"Country{i}",
-                last_name=f"User{i}",
-                email=f"country{i}@example.com"
-            )
-            users.append(user)
-        
-        db.add_all(users)
-        db.commit()
-        
-        # Refresh to get IDs
-        for user in users:
-            db.refresh(user)
-        
-        # Create test transactions
+    user_rows = [
+        {
+            "first_name": f"Country{i}",
+            "last_name": f"User{i}",
+            "email": f"country{i}@example.com"
+        }
+        for i in range(20)
+    ]
+    
+    def build_transaction_rows(user_ids):
+        # Transactions spread over 60 days
         base_date = date.today() - timedelta(days=60)
-        transactions = []
-        
-        for i in range(200):
-            transaction = Transaction(
-                user_id=users[i % len(users)].id,
-                amount=50.0 + (i % 200),
-                status=TransactionStatus.SUCCESSFUL if i % 4 != 0 else TransactionStatus.FAILED,
-                type=TransactionType.PAYMENT if i % 2 == 0 else TransactionType.INVOICE,
-                transaction_date=base_date + timedelta(days=i % 60)
-            )
-            transactions.append(transaction)
-        
-        db.add_all(transactions)
-        db.commit()
-        
-        # Create temporary CSV file with user-country mapping
-        csv_data = "user_id;country\n"
+        return [
+            {
+                "user_id": user_ids[i % len(user_ids)],
+                "amount": 50.0 + i,
+                "status": TransactionStatus.SUCCESSFUL if i % 4 != 0 else TransactionStatus.FAILED,
+                "type": TransactionType.PAYMENT if i % 2 == 0 else TransactionType.INVOICE,
+                "transaction_date": base_date + timedelta(days=i * 60 // size)
+            }
+            for i in range(size)
+        ]
+    
+    with seed_tables(user_rows, build_transaction_rows) as user_ids:
+        # Build the user-country mapping once; the mock loader returns it as is
         country_mapping = [
             "Germany", "Canada", "France", "United States", "India",
             "Brazil", "Japan", "Australia", "Poland", "United Kingdom",
             "Italy", "Spain", "Netherlands", "Sweden", "Mexico",
             "Argentina", "South Korea", "Thailand", "Malaysia", "Singapore"
         ]
+        user_countries = {
+            user_id: country_mapping[i % len(country_mapping)]
+            for i, user_id in enumerate(user_ids)
+        }
         
-        for i, user in enumerate(users):
-            csv_data += f"{user.id};{country_mapping[i % len(country_mapping)]}\n"
-        
-        # Write to temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_data)
-            temp_csv_path = f.name
-        
-        # Update the data_loader to use our temp file
+        # Update the data_loader to return the precomputed mapping
         import app.utils.data_loader
         original_load = app.utils.data_loader.load_user_countries
-        
-        def mock_load_user_countries(csv_path):
-            """Mock loader that uses our temp file."""
-            try:
-                df = pd.read_csv(temp_csv_path, sep=';')
-                user_countries = dict(zip(df['user_id'], df['country']))
-                return user_countries
-            except Exception:
-                return {}
-        
-        app.utils.data_loader.load_user_countries = mock_load_user_countries
-        
-        yield temp_csv_path
-        
-    finally:
-        # Cleanup
-        db.close()
-        Base.metadata.drop_all(bind=engine)
-        
-        # Restore original function
-        import app.utils.data_loader
-        app.utils.data_loader.load_user_countries = original_load
-        
-        # Clean up temp file
-        if 'temp_csv_path' in locals():
-            try:
-                os.unlink(temp_csv_path)
-            except:
-                pass
+        app.utils.data_loader.load_user_countries = lambda _csv_path: user_countries
+        try:
+            yield user_countries
+        finally:
+            app.utils.data_loader.load_user_countries = original_load
 
 
 class TestCountryReportsAPI:
     """Test class for country reports API."""
     
-    def test_country_report_basic(self, setup_country_test_data):
+    def test_country_report_basic(self, client, setup_country_test_data):
         """Test basic country report endpoint."""
         response = client.get("/report/by-country")
         assert response.status_code == 200
@@ -179,7 +119,7 @@ class TestCountryReportsAPI:
         assert "average_per_country" in summary
         assert "top_performer" in summary
     
-    def test_country_report_with_date_filter(self, setup_country_test_data):
+    def test_country_report_with_date_filter(self, client, setup_country_test_data):
         """Test country report with date filters."""
         start_date = (date.today() - timedelta(days=30)).isoformat()
         end_date = date.today().isoformat()
@@ -191,46 +131,25 @@ class TestCountryReportsAPI:
         assert data["period"]["start_date"] == start_date
         assert data["period"]["end_date"] == end_date
     
-    def test_country_report_sort_by_count(self, setup_country_test_data):
-        """Test country report sorted by transaction count."""
-        response = client.get("/report/by-country?sort_by=count")
-        assert response.status_code == 200
-        
-        data = response.json()
-        countries = data["countries"]
-        
-        # Check that countries are sorted by count (descending)
-        if len(countries) > 1:
-            for i in range(len(countries) - 1):
-                assert countries[i]["transaction_count"] >= countries[i + 1]["transaction_count"]
-    
-    def test_country_report_sort_by_total(self, setup_country_test_data):
-        """Test country report sorted by total amount."""
-        response = client.get("/report/by-country?sort_by=total")
-        assert response.status_code == 200
-        
-        data = response.json()
-        countries = data["countries"]
-        
-        # Check that countries are sorted by total amount (descending)
-        if len(countries) > 1:
-            for i in range(len(countries) - 1):
-                assert countries[i]["total_amount"] >= countries[i + 1]["total_amount"]
-    
-    def test_country_report_sort_by_avg(self, setup_country_test_data):
-        """Test country report sorted by average amount."""
-        response = client.get("/report/by-country?sort_by=avg")
+    @pytest.mark.parametrize("sort_by, field", [
+        ("count", "transaction_count"),
+        ("total", "total_amount"),
+        ("avg", "average_amount"),
+    ])
+    def test_country_report_sort(self, client, setup_country_test_data, sort_by, field):
+        """Test country report sorted by each supported field."""
+        response = client.get(f"/report/by-country?sort_by={sort_by}")
         assert response.status_code == 200
         
         data = response.json()
         countries = data["countries"]
         
-        # Check that countries are sorted by average amount (descending)
+        # Check that countries are sorted by the field (descending)
         if len(countries) > 1:
             for i in range(len(countries) - 1):
-                assert countries[i]["average_amount"] >= countries[i + 1]["average_amount"]
+                assert countries[i][field] >= countries[i + 1][field]
     
-    def test_country_report_top_n_filter(self, setup_country_test_data):
+    def test_country_report_top_n_filter(self, client, setup_country_test_data):
         """Test country report with top_n filter."""
         response = client.get("/report/by-country?top_n=5")
         assert response.status_code == 200
@@ -241,7 +160,7 @@ class TestCountryReportsAPI:
         # Should return at most 5 countries
         assert len(countries) <= 5
     
-    def test_country_report_status_filter(self, setup_country_test_data):
+    def test_country_report_status_filter(self, client, setup_country_test_data):
         """Test country report with status filter."""
         response = client.get("/report/by-country?status=all")
         assert response.status_code == 200
@@ -249,7 +168,7 @@ class TestCountryReportsAPI:
         data = response.json()
         assert data["filters"]["status"] == "all"
     
-    def test_country_report_type_filter(self, setup_country_test_data):
+    def test_country_report_type_filter(self, client, setup_country_test_data):
         """Test country report with type filter."""
         response = client.get("/report/by-country?type=payment")
         assert response.status_code == 200
@@ -257,31 +176,20 @@ class TestCountryReportsAPI:
         data = response.json()
         assert data["filters"]["type"] == "payment"
     
-    def test_country_report_invalid_sort_by(self, setup_country_test_data):
-        """Test country report with invalid sort_by parameter."""
-        response = client.get("/report/by-country?sort_by=invalid")
-        assert response.status_code == 400
-        
-        data = response.json()
-        assert "Invalid sort_by" in data["detail"]
-    
-    def test_country_report_invalid_status(self, setup_country_test_data):
-        """Test country report with invalid status parameter."""
-        response = client.get("/report/by-country?status=invalid")
-        assert response.status_code == 400
-        
-        data = response.json()
-        assert "Invalid status" in data["detail"]
-    
-    def test_country_report_invalid_type(self, setup_country_test_data):
-        """Test country report with invalid type parameter."""
-        response = client.get("/report/by-country?type=invalid")
-        assert response.status_code == 400
-        
-        data = response.json()
-        assert "Invalid type" in data["detail"]
+    @pytest.mark.parametrize("param, value, error", [
+        ("sort_by", "invalid", "Invalid sort_by"),
+        ("status", "invalid", "Invalid status"),
+        ("type", "invalid", "Invalid type"),
+    ])
+    def test_country_report_invalid_parameter(self, call_endpoint, param, value, error):
+        """Test country report with an invalid sort_by, status or type parameter."""
+        with pytest.raises(HTTPException) as exc_info:
+            call_endpoint(get_country_report, **{param: value})
+        
+        assert exc_info.value.status_code == 400
+        assert error in exc_info.value.detail
     
-    def test_country_report_invalid_top_n(self, setup_country_test_data):
+    def test_country_report_invalid_top_n(self, client):
         """Test country report with invalid top_n parameter."""
         # Test top_n too small
         response = client.get("/report/by-country?top_n=0")
@@ -291,18 +199,19 @@ class TestCountryReportsAPI:
         response = client.get("/report/by-country?top_n=101")
         assert response.status_code == 422  # Validation error
     
-    def test_country_report_date_validation(self, setup_country_test_data):
+    def test_country_report_date_validation(self, call_endpoint):
         """Test date range validation."""
-        start_date = date.today().isoformat()
-        end_date = (date.today() - timedelta(days=1)).isoformat()
-        
-        response = client.get(f"/report/by-country?start_date={start_date}&end_date={end_date}")
-        assert response.status_code == 400
+        with pytest.raises(HTTPException) as exc_info:
+            call_endpoint(
+                get_country_report,
+                start_date=date.today(),
+                end_date=date.today() - timedelta(days=1)
+            )
         
-        data = response.json()
-        assert "Start date cannot be after end date" in data["detail"]
+        assert exc_info.value.status_code == 400
+        assert "Start date cannot be after end date" in exc_info.value.detail
     
-    def test_country_report_empty_data(self, setup_country_test_data):
+    def test_country_report_empty_data(self, client, setup_country_test_data):
         """Test country report with empty transaction data."""
         # Use a date range far in the future
         future_date = (date.today() + timedelta(days=365)).isoformat()
@@ -319,7 +228,7 @@ class TestCountryReportsAPI:
         assert data["summary"]["total_transactions"] == 0
         assert data["summary"]["total_amount"] == 0.0
     
-    def test_country_report_csv_loading_error(self, setup_country_test_data):
+    def test_country_report_csv_loading_error(self, client, setup_country_test_data):
         """Test country report when CSV loading fails."""
         import app.utils.data_loader
         
@@ -339,3 +248,32 @@ class TestCountryReportsAPI:
         finally:
             # Restore original function
             app.utils.data_loader.load_user_countries = original_load
+
+
+class TestCountryAggregation:
+    """Test class for rolling per-user aggregates up to countries."""
+    
+    def test_aggregate_by_country(self):
+        """Test that users are grouped by country with correct totals."""
+        user_rows = [
+            SimpleNamespace(user_id=1, transaction_count=2, total_amount=100.0),
+            SimpleNamespace(user_id=2, transaction_count=3, total_amount=50.0),
+            SimpleNamespace(user_id=3, transaction_count=1, total_amount=25.5),
+            SimpleNamespace(user_id=4, transaction_count=5, total_amount=999.0),  # No country
+        ]
+        user_countries = {1: "Germany", 2: "Germany", 3: "France"}
+        
+        countries = {c["country"]: c for c in _aggregate_by_country(user_rows, user_countries)}
+        
+        assert set(countries) == {"Germany", "France"}
+        assert countries["Germany"]["transaction_count"] == 5
+        assert countries["Germany"]["total_amount"] == 150.0
+        assert countries["Germany"]["average_amount"] == 30.0
+        assert countries["Germany"]["unique_users"] == 2
+        assert countries["France"]["unique_users"] == 1
+    
+    def test_aggregate_by_country_no_mapping(self):
+        """Test that users without a country mapping are ignored."""
+        user_rows = [SimpleNamespace(user_id=1, transaction_count=1, total_amount=10.0)]
+        
+        assert _aggregate_by_country(user_rows, {}) == []
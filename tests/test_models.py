@@ -2,11 +2,85 @@
 Tests for database models.
 """
 
+import importlib.util
 import pytest
 from datetime import datetime, date
 from decimal import Decimal
+from pathlib import Path
+from unittest.mock import MagicMock
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, func, inspect, select
+from sqlalchemy.exc import InvalidRequestError
 
-from app.models import User, Transaction, TransactionStatus, TransactionType
+from app.database import Base
+from app.models import (
+    DailyStats, User, Transaction, TransactionStatus, TransactionType, _install_daily_stats_after_create
+)
+
+# Fixed timestamps for tests that only need some transaction date
+FIXED_NOW = datetime(2024, 1, 1, 12, 0, 0)
+FIXED_TODAY = date(2024, 1, 1)
+
+# Amounts with various decimal places for precision tests
+AMOUNTS = (Decimal("1.00"), Decimal("100.50"), Decimal("999.99"), Decimal("1000.00"))
+
+_USER_DEFAULTS = dict(first_name="John", last_name="Doe", email="john.doe@example.com")
+_TRANSACTION_DEFAULTS = dict(
+    user_id=1,
+    amount=Decimal("100.00"),
+    status=TransactionStatus.SUCCESSFUL,
+    type=TransactionType.PAYMENT,
+    transaction_date=FIXED_NOW
+)
+
+# Schema the models produced before the initial Alembic revision, with
+# VARCHAR status/type columns and the original transactions indexes
+_BASELINE_SCHEMA = (
+    """CREATE TABLE users (
+        id INTEGER NOT NULL PRIMARY KEY,
+        first_name VARCHAR(100) NOT NULL,
+        last_name VARCHAR(100) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        is_active BOOLEAN NOT NULL
+    )""",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE INDEX idx_users_email_active ON users (email, is_active)",
+    "CREATE INDEX idx_users_created_at ON users (created_at)",
+    """CREATE TABLE transactions (
+        id INTEGER NOT NULL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users (id),
+        amount NUMERIC(10, 2) NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        type VARCHAR(20) NOT NULL,
+        transaction_date DATETIME NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL
+    )""",
+    "CREATE INDEX ix_transactions_id ON transactions (id)",
+    "CREATE INDEX ix_transactions_user_id ON transactions (user_id)",
+    "CREATE INDEX ix_transactions_status ON transactions (status)",
+    "CREATE INDEX ix_transactions_type ON transactions (type)",
+    "CREATE INDEX ix_transactions_transaction_date ON transactions (transaction_date)",
+    "CREATE INDEX idx_transactions_user_status ON transactions (user_id, status)",
+    "CREATE INDEX idx_transactions_date_status ON transactions (transaction_date, status)",
+    "CREATE INDEX idx_transactions_type_status ON transactions (type, status)",
+    "CREATE INDEX idx_transactions_user_date ON transactions (user_id, transaction_date)",
+    "CREATE INDEX idx_transactions_amount_status ON transactions (amount, status)",
+)
+
+
+def _make_user(**overrides) -> User:
+    """Build a User from default field values and overrides."""
+    return User(**{**_USER_DEFAULTS, **overrides})
+
+
+def _make_transaction(**overrides) -> Transaction:
+    """Build a Transaction from default field values and overrides."""
+    return Transaction(**{**_TRANSACTION_DEFAULTS, **overrides})
 
 
 class TestUserModel:
@@ -14,11 +88,7 @@ class TestUserModel:
     
     def test_user_creation(self):
         """Test user model creation."""
-        user = User(
-            first_name="John",
-            last_name="Doe",
-            email="john.doe@example.com"
-        )
+        user = _make_user()
         
         assert user.first_name == "John"
         assert user.last_name == "Doe"
@@ -28,41 +98,32 @@ class TestUserModel:
     
     def test_user_repr(self):
         """Test user model string representation."""
-        user = User(
-            id=1,
-            first_name="John",
-            last_name="Doe",
-            email="john.doe@example.com"
-        )
+        user = _make_user(id=1)
         
         expected = "<User(id=1, email=john.doe@example.com)>"
         assert str(user) == expected
     
     def test_user_relationships(self):
         """Test user-transaction relationship."""
-        user = User(
-            id=1,
-            first_name="John",
-            last_name="Doe",
-            email="john.doe@example.com"
-        )
+        user = _make_user(id=1)
         
         # Initially empty
         assert len(user.transactions) == 0
         
         # Add transaction
-        transaction = Transaction(
-            id=1,
-            user_id=1,
-            amount=Decimal("100.00"),
-            status=TransactionStatus.SUCCESSFUL,
-            type=TransactionType.PAYMENT,
-            transaction_date=datetime.now()
-        )
+        transaction = _make_transaction(id=1)
         
         user.transactions.append(transaction)
         assert len(user.transactions) == 1
         assert user.transactions[0].id == 1
+    
+    def test_transaction_user_is_not_lazy_loaded(self, db_session, sample_transactions):
+        """Test that accessing Transaction.user without eager loading raises."""
+        db_session.expire_all()
+        transaction = db_session.get(Transaction, sample_transactions[0].id)
+        
+        with pytest.raises(InvalidRequestError):
+            transaction.user
 
 
 class TestTransactionModel:
@@ -70,67 +131,48 @@ class TestTransactionModel:
     
     def test_transaction_creation(self):
         """Test transaction model creation."""
-        transaction_date = datetime.now()
-        transaction = Transaction(
-            user_id=1,
-            amount=Decimal("100.50"),
-            status=TransactionStatus.SUCCESSFUL,
-            type=TransactionType.PAYMENT,
-            transaction_date=transaction_date
-        )
+        transaction = _make_transaction(amount=Decimal("100.50"))
         
         assert transaction.user_id == 1
         assert transaction.amount == Decimal("100.50")
         assert transaction.status == TransactionStatus.SUCCESSFUL
         assert transaction.type == TransactionType.PAYMENT
-        assert transaction.transaction_date == transaction_date
+        assert transaction.transaction_date == FIXED_NOW
         # created_at and updated_at are set by database defaults
     
     def test_transaction_repr(self):
         """Test transaction model string representation."""
-        transaction = Transaction(
-            id=1,
-            user_id=1,
-            amount=Decimal("100.00"),
-            status=TransactionStatus.SUCCESSFUL,
-            type=TransactionType.PAYMENT,
-            transaction_date=datetime.now()
-        )
+        transaction = _make_transaction(id=1)
         
         expected = "<Transaction(id=1, user_id=1, amount=100.00, status=successful)>"
         assert str(transaction) == expected
     
     def test_transaction_amount_decimal_property(self):
         """Test transaction amount_decimal property."""
-        transaction = Transaction(
-            id=1,
-            user_id=1,
-            amount=Decimal("100.50"),
-            status=TransactionStatus.SUCCESSFUL,
-            type=TransactionType.PAYMENT,
-            transaction_date=datetime.now()
-        )
+        transaction = _make_transaction(id=1, amount=Decimal("100.50"))
         
         assert transaction.amount_decimal == Decimal("100.50")
         assert isinstance(transaction.amount_decimal, Decimal)
     
-    def test_transaction_status_enum(self):
-        """Test transaction status enum values."""
-        assert TransactionStatus.SUCCESSFUL == "successful"
-        assert TransactionStatus.FAILED == "failed"
+    @pytest.mark.parametrize("enum_cls, value, name", [
+        (TransactionStatus, "successful", "SUCCESSFUL"),
+        (TransactionStatus, "failed", "FAILED"),
+        (TransactionType, "payment", "PAYMENT"),
+        (TransactionType, "invoice", "INVOICE"),
+    ])
+    def test_enum_value(self, enum_cls, value, name):
+        """Test enum members compare equal to their values and are created from them."""
+        member = getattr(enum_cls, name)
         
-        # Test enum creation
-        status = TransactionStatus("successful")
-        assert status == TransactionStatus.SUCCESSFUL
+        assert member == value
+        assert enum_cls(value) is member
     
-    def test_transaction_type_enum(self):
-        """Test transaction type enum values."""
-        assert TransactionType.PAYMENT == "payment"
-        assert TransactionType.INVOICE == "invoice"
-        
-        # Test enum creation
-        trans_type = TransactionType("payment")
-        assert trans_type == TransactionType.PAYMENT
+    def test_enum_members_and_str(self):
+        """Test that enums are iterable and format as their values."""
+        assert [s.value for s in TransactionStatus] == ["successful", "failed"]
+        assert [t.value for t in TransactionType] == ["payment", "invoice"]
+        assert str(TransactionStatus.FAILED) == "failed"
+        assert f"{TransactionType.INVOICE}" == "invoice"
 
 
 class TestModelConstraints:
@@ -139,63 +181,117 @@ class TestModelConstraints:
     def test_user_email_uniqueness(self):
         """Test that user email should be unique."""
         # This would be enforced at database level
-        user1 = User(
-            first_name="John",
-            last_name="Doe",
-            email="john@example.com"
-        )
-        
-        user2 = User(
-            first_name="Jane",
-            last_name="Smith",
-            email="john@example.com"  # Same email
-        )
+        user1 = _make_user(email="john@example.com")
+        user2 = _make_user(first_name="Jane", last_name="Smith", email="john@example.com")  # Same email
         
         # Models themselves don't enforce uniqueness, but database should
         assert user1.email == user2.email
     
-    def test_transaction_amount_precision(self):
-        """Test transaction amount precision."""
-        # Test with various decimal places
-        amounts = [
-            Decimal("1.00"),
-            Decimal("100.50"),
-            Decimal("999.99"),
-            Decimal("1000.00")
-        ]
-        
-        for amount in amounts:
-            transaction = Transaction(
-                user_id=1,
-                amount=amount,
-                status=TransactionStatus.SUCCESSFUL,
-                type=TransactionType.PAYMENT,
-                transaction_date=datetime.now()
-            )
-            assert transaction.amount == amount
-    
-    def test_transaction_date_validation(self):
-        """Test transaction date handling."""
-        # Test with datetime
-        transaction_date = datetime.now()
-        transaction = Transaction(
-            user_id=1,
-            amount=Decimal("100.00"),
-            status=TransactionStatus.SUCCESSFUL,
-            type=TransactionType.PAYMENT,
-            transaction_date=transaction_date
-        )
+    @pytest.mark.parametrize("amount", AMOUNTS)
+    def test_transaction_amount_precision(self, amount):
+        """Test transaction amount precision with various decimal places."""
+        transaction = _make_transaction(amount=amount)
+        assert transaction.amount == amount
+    
+    @pytest.mark.parametrize("transaction_date", [FIXED_NOW, FIXED_TODAY], ids=["datetime", "date"])
+    def test_transaction_date_validation(self, transaction_date):
+        """Test transaction date handling for datetimes and plain dates."""
+        transaction = _make_transaction(transaction_date=transaction_date)
         
         assert transaction.transaction_date == transaction_date
+
+
+class TestDailyStatsModel:
+    """Test class for the trigger-maintained DailyStats aggregates."""
+    
+    def test_daily_stats_follow_transaction_writes(self, db_session, sample_transactions):
+        """Test that inserts and updates on transactions are reflected in DailyStats."""
+        total_count, total_amount = db_session.query(
+            func.sum(DailyStats.transaction_count), func.sum(DailyStats.total_amount)
+        ).one()
+        
+        assert total_count == len(sample_transactions)
+        assert float(total_amount) == pytest.approx(sum(float(t.amount) for t in sample_transactions))
         
-        # Test with date
-        date_only = date.today()
-        transaction = Transaction(
-            user_id=1,
-            amount=Decimal("100.00"),
-            status=TransactionStatus.SUCCESSFUL,
-            type=TransactionType.PAYMENT,
-            transaction_date=date_only
+        # Updates recompute the affected day so min/max stay exact
+        transaction = sample_transactions[0]
+        transaction.amount = Decimal("999.00")
+        db_session.commit()
+        
+        stats = db_session.get(
+            DailyStats, (transaction.transaction_date.date(), transaction.status, transaction.type)
         )
+        assert stats.max_amount == Decimal("999.00")
+    
+    def test_create_all_without_transactions_skips_triggers(self):
+        """Test that a partial create_all leaves the daily stats table and triggers out."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[User.__table__])
+        
+        assert inspect(engine).get_table_names() == ["users"]
+        engine.dispose()
+    
+    def test_create_all_on_unsupported_dialect_skips_triggers(self):
+        """Test that schema creation on a dialect without trigger DDL does not fail."""
+        connection = MagicMock()
+        connection.dialect.name = "mysql"
+        
+        _install_daily_stats_after_create(Base.metadata, connection, tables=[Transaction.__table__])
+        
+        connection.execute.assert_not_called()
+    
+    @staticmethod
+    def _run_initial_migration(conn):
+        """Load the initial Alembic revision and run its upgrade on a connection."""
+        migration_path = Path(__file__).resolve().parents[1] / "migrations" / "versions" / "0001_initial_schema.py"
+        spec = importlib.util.spec_from_file_location("initial_schema", migration_path)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+    
+    def test_migration_builds_schema_on_empty_database(self):
+        """Test the Alembic revision creates every table, index and trigger without create_all."""
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            self._run_initial_migration(conn)
+            
+            indexes = {index["name"] for index in inspect(conn).get_indexes("transactions")}
+            assert indexes == {index.name for index in Transaction.__table__.indexes}
+            
+            conn.execute(User.__table__.insert(), {**_USER_DEFAULTS, "id": 1})
+            conn.execute(Transaction.__table__.insert(), _TRANSACTION_DEFAULTS)
+            stats = conn.execute(select(DailyStats)).one()
+            assert (stats.date, stats.transaction_count) == (FIXED_TODAY, 1)
+        
+        engine.dispose()
+    
+    def test_migration_upgrades_baseline_schema(self):
+        """Test the Alembic revision on a database built by the pre-migration create_all."""
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            for statement in _BASELINE_SCHEMA:
+                conn.exec_driver_sql(statement)
+            conn.execute(User.__table__.insert(), {**_USER_DEFAULTS, "id": 1})
+            conn.execute(Transaction.__table__.insert(), [
+                {**_TRANSACTION_DEFAULTS, "amount": Decimal("10.00")},
+                {**_TRANSACTION_DEFAULTS, "amount": Decimal("30.00")},
+            ])
+            
+            self._run_initial_migration(conn)
+            
+            # The baseline indexes are replaced by the current ones
+            indexes = {index["name"] for index in inspect(conn).get_indexes("transactions")}
+            assert indexes == {index.name for index in Transaction.__table__.indexes}
+            
+            # Existing rows are backfilled
+            stats = conn.execute(select(DailyStats)).one()
+            assert (stats.date, stats.transaction_count, stats.total_amount) == (FIXED_TODAY, 2, Decimal("40.00"))
+            
+            # New rows are picked up by the triggers
+            conn.execute(Transaction.__table__.insert(), {**_TRANSACTION_DEFAULTS, "amount": Decimal("5.00")})
+            stats = conn.execute(select(DailyStats)).one()
+            assert (stats.transaction_count, stats.min_amount) == (3, Decimal("5.00"))
         
-        assert transaction.transaction_date == date_only
+        engine.dispose()
@@ -3,91 +3,53 @@ Tests for the reports API endpoints.
 """
 
 import pytest
-from datetime import date, timedelta
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from datetime import date, datetime, timedelta
+from fastapi import HTTPException
 
 from app.main import app
-from app.database import get_db, Base
-from app.models import User, Transaction, TransactionStatus, TransactionType
+from app.config import Settings, get_settings
+from app.models import Transaction, TransactionStatus, TransactionType
+from app.routers.reports import get_transaction_report
 
-# Test database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Every test runs in a transaction that is rolled back afterwards
+pytestmark = pytest.mark.usefixtures("rollback_transaction")
 
 
-def override_get_db():
-    """Override database dependency for testing."""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-app.dependency_overrides[get_db] = override_get_db
-
-# Create test client
-client = TestClient(app)
-
-
-@pytest.fixture(scope="function")
-def setup_test_data():
-    """Setup test data for each test."""
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-    
-    db = TestingSessionLocal()
-    
-    try:
-        # Create test users
-        users = []
-        for i in range(5):
-            user = User(
-                first_name=f"Test{i}",
-                last_name=f"User{i}",
-                email=f"test{i}@example.com"
-            )
-            users.append(user)
-        
-        db.add_all(users)
-        db.commit()
-        
-        # Refresh to get IDs
-        for user in users:
-            db.refresh(user)
-        
-        # Create test transactions
+@pytest.fixture(scope="module")
+def setup_test_data(seed_tables):
+    """Setup test data, created once per module."""
+    # Explicit IDs need no read-back after the insert
+    user_rows = [
+        {
+            "id": i + 1,
+            "first_name": f"Test{i}",
+            "last_name": f"User{i}",
+            "email": f"test{i}@example.com"
+        }
+        for i in range(5)
+    ]
+    
+    def build_transaction_rows(user_ids):
         base_date = date.today() - timedelta(days=30)
-        transactions = []
-        
-        for i in range(100):
-            transaction = Transaction(
-                user_id=users[i % len(users)].id,
-                amount=100.0 + i,
-                status=TransactionStatus.SUCCESSFUL if i % 4 != 0 else TransactionStatus.FAILED,
-                type=TransactionType.PAYMENT if i % 3 != 0 else TransactionType.INVOICE,
-                transaction_date=base_date + timedelta(days=i // 3)  # Spread across different days
-            )
-            transactions.append(transaction)
-        
-        db.add_all(transactions)
-        db.commit()
-        
+        return [
+            {
+                "user_id": user_ids[i % len(user_ids)],
+                "amount": 100.0 + i,
+                "status": TransactionStatus.SUCCESSFUL if i % 4 != 0 else TransactionStatus.FAILED,
+                "type": TransactionType.PAYMENT if i % 3 != 0 else TransactionType.INVOICE,
+                "transaction_date": base_date + timedelta(days=i // 3)  # Spread across different days
+            }
+            for i in range(100)
+        ]
+    
+    with seed_tables(user_rows, build_transaction_rows):
         yield
-        
-    finally:
-        # Cleanup
-        db.close()
-        Base.metadata.drop_all(bind=engine)
 
 
 class TestReportsAPI:
     """Test class for reports API."""
     
-    def test_root_endpoint(self):
+    def test_root_endpoint(self, client):
         """Test root endpoint."""
         response = client.get("/")
         assert response.status_code == 200
@@ -96,14 +58,33 @@ class TestReportsAPI:
         assert "version" in data
         assert data["docs"] == "/docs"
     
-    def test_health_endpoint(self):
+    def test_root_endpoint_settings_override(self, client):
+        """Test that the root endpoint reads settings through the dependency."""
+        app.dependency_overrides[get_settings] = lambda: Settings(app_version="9.9.9")
+        try:
+            response = client.get("/")
+            assert response.status_code == 200
+            assert response.json()["version"] == "9.9.9"
+        finally:
+            del app.dependency_overrides[get_settings]
+    
+    def test_cors_rejects_unlisted_origin(self, client):
+        """Test that CORS preflights only succeed for configured origins."""
+        response = client.options("/report/", headers={
+            "Origin": "https://unlisted.example.com",
+            "Access-Control-Request-Method": "GET",
+        })
+        assert response.status_code == 400
+        assert "access-control-allow-origin" not in response.headers
+    
+    def test_health_endpoint(self, client):
         """Test health check endpoint."""
         response = client.get("/health")
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "healthy"
     
-    def test_report_basic(self, setup_test_data):
+    def test_report_basic(self, client, setup_test_data):
         """Test basic report endpoint."""
         response = client.get("/report/")
         assert response.status_code == 200
@@ -119,7 +100,7 @@ class TestReportsAPI:
         assert "total_amount" in metrics
         assert metrics["total_transactions"] > 0
     
-    def test_report_with_date_filter(self, setup_test_data):
+    def test_report_with_date_filter(self, client, setup_test_data):
         """Test report endpoint with date filters."""
         start_date = (date.today() - timedelta(days=10)).isoformat()
         end_date = date.today().isoformat()
@@ -131,7 +112,7 @@ class TestReportsAPI:
         assert data["period"]["start_date"] == start_date
         assert data["period"]["end_date"] == end_date
     
-    def test_report_with_status_filter(self, setup_test_data):
+    def test_report_with_status_filter(self, client, setup_test_data):
         """Test report endpoint with status filter."""
         response = client.get("/report/?status=successful")
         assert response.status_code == 200
@@ -139,7 +120,7 @@ class TestReportsAPI:
         data = response.json()
         assert data["filters"]["status"] == "successful"
     
-    def test_report_with_type_filter(self, setup_test_data):
+    def test_report_with_type_filter(self, client, setup_test_data):
         """Test report endpoint with type filter."""
         response = client.get("/report/?type=payment")
         assert response.status_code == 200
@@ -147,7 +128,7 @@ class TestReportsAPI:
         data = response.json()
         assert data["filters"]["type"] == "payment"
     
-    def test_report_with_avg_min_max(self, setup_test_data):
+    def test_report_with_avg_min_max(self, client, setup_test_data):
         """Test report endpoint with avg, min, max included."""
         response = client.get("/report/?include_avg=true&include_min=true&include_max=true")
         assert response.status_code == 200
@@ -159,7 +140,7 @@ class TestReportsAPI:
         assert "maximum_amount" in metrics
     
     @pytest.mark.skip("Temporarily disabled - needs investigation")
-    def test_report_with_daily_shift(self, setup_test_data):
+    def test_report_with_daily_shift(self, client, setup_test_data):
         """Test report endpoint with daily breakdown."""
         response = client.get("/report/?include_daily_shift=true")
         if response.status_code != 200:
@@ -181,37 +162,80 @@ class TestReportsAPI:
             assert "total_amount" in first_day
             assert "percent_change" in first_day
     
-    def test_invalid_date_format(self, setup_test_data):
-        """Test report endpoint with invalid date format."""
-        response = client.get("/report/?start_date=invalid-date")
-        assert response.status_code == 400
+    def test_report_includes_whole_end_date(self, client, rollback_transaction):
+        """Test that metrics and daily breakdown both count transactions late on the end date."""
+        rollback_transaction.execute(Transaction.__table__.insert(), [
+            {
+                "user_id": 1,
+                "amount": 10.0,
+                "status": TransactionStatus.SUCCESSFUL,
+                "type": TransactionType.PAYMENT,
+                "transaction_date": datetime(2020, 3, 9, 12, 0)
+            },
+            {
+                "user_id": 1,
+                "amount": 20.0,
+                "status": TransactionStatus.SUCCESSFUL,
+                "type": TransactionType.PAYMENT,
+                "transaction_date": datetime(2020, 3, 10, 23, 30)
+            },
+        ])
+        
+        response = client.get(
+            "/report/?start_date=2020-03-09&end_date=2020-03-10&status=successful&include_daily_shift=true"
+        )
+        assert response.status_code == 200
         
         data = response.json()
-        assert "Invalid date format" in data["detail"]
+        assert data["metrics"]["total_transactions"] == 2
+        assert data["metrics"]["total_amount"] == 30.0
+        assert [day["transaction_count"] for day in data["daily_breakdown"]] == [1, 1]
     
-    def test_invalid_status(self, setup_test_data):
-        """Test report endpoint with invalid status."""
-        response = client.get("/report/?status=invalid")
-        assert response.status_code == 400
+    def test_invalid_date_format(self, client):
+        """Test report endpoint with invalid date format."""
+        response = client.get("/report/?start_date=invalid-date")
+        assert response.status_code == 422
         
         data = response.json()
-        assert "Invalid status" in data["detail"]
+        assert data["detail"][0]["loc"] == ["query", "start_date"]
     
-    def test_invalid_type(self, setup_test_data):
-        """Test report endpoint with invalid type."""
-        response = client.get("/report/?type=invalid")
-        assert response.status_code == 400
-        
-        data = response.json()
-        assert "Invalid type" in data["detail"]
+    @pytest.mark.parametrize("param, value, error", [
+        ("status", "invalid", "Invalid status"),
+        ("type", "invalid", "Invalid type"),
+    ])
+    def test_invalid_query_param(self, call_endpoint, param, value, error):
+        """Test report endpoint with an invalid status or type."""
+        with pytest.raises(HTTPException) as exc_info:
+            call_endpoint(get_transaction_report, **{param: value})
+        
+        assert exc_info.value.status_code == 400
+        assert error in exc_info.value.detail
     
-    def test_start_date_after_end_date(self, setup_test_data):
+    def test_start_date_after_end_date(self, call_endpoint):
         """Test report endpoint with start date after end date."""
-        start_date = date.today().isoformat()
-        end_date = (date.today() - timedelta(days=1)).isoformat()
-        
-        response = client.get(f"/report/?start_date={start_date}&end_date={end_date}")
-        assert response.status_code == 400
+        with pytest.raises(HTTPException) as exc_info:
+            call_endpoint(
+                get_transaction_report,
+                start_date=date.today(),
+                end_date=date.today() - timedelta(days=1)
+            )
         
-        data = response.json()
-        assert "Start date cannot be after end date" in data["detail"]
+        assert exc_info.value.status_code == 400
+        assert "Start date cannot be after end date" in exc_info.value.detail
+    
+    def test_report_conditional_get(self, client, setup_test_data):
+        """Test ETag and Cache-Control headers and 304 on a matching If-None-Match."""
+        response = client.get("/report/?status=successful")
+        assert response.status_code == 200
+        assert response.headers["cache-control"].startswith("public, max-age=")
+        etag = response.headers["etag"]
+        
+        not_modified = client.get("/report/?status=successful", headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == etag
+        assert not_modified.content == b""
+        
+        # A different report has a different body and ETag
+        other = client.get("/report/?status=failed", headers={"If-None-Match": etag})
+        assert other.status_code == 200
+        assert other.headers["etag"] != etag
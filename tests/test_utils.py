@@ -3,148 +3,201 @@ Tests for utility functions and modules.
 """
 
 import pytest
-import tempfile
 import os
-import pandas as pd
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 
-from app.utils.data_loader import load_user_countries
-from app.utils.analytics import TransactionAnalytics
+from sqlalchemy.orm import Session
+
+from app.utils import data_loader
+from app.utils.data_loader import get_user_countries, load_user_countries
+from app.models import TransactionStatus, TransactionType
+from app.utils.analytics import TransactionAnalytics, _build_base_filters
+from app.utils import cache as cache_module
+
+
+def _mock_session(rows, first):
+    """Build a mock session whose chained queries return the given results."""
+    query = MagicMock()
+    query.filter.return_value = query
+    query.group_by.return_value = query
+    query.order_by.return_value = query
+    query.limit.return_value = query
+    query.all.return_value = rows
+    query.first.return_value = first
+    
+    session = MagicMock(spec=Session)
+    session.query.return_value = query
+    return session
+
+
+@pytest.fixture(scope="class")
+def date_range():
+    """Last 30 days, shared by the analytics tests of a class."""
+    return date.today() - timedelta(days=30), date.today()
 
 
 class TestDataLoader:
     """Test class for data loader utilities."""
     
-    def test_load_user_countries_success(self):
-        """Test successful loading of user countries CSV."""
-        # Create temporary CSV file
-        csv_data = "user_id;country\n1;Germany\n2;France\n3;United States\n"
+    @pytest.fixture(scope="class", params=[
+        (
+            "user_id;country\n1;Germany\n2;France\n3;United States\n",
+            {1: "Germany", 2: "France", 3: "United States"}
+        ),
+        ("", {}),
+        ("invalid,csv,format\nno,semicolon,separators", {}),
+    ], ids=["valid", "empty", "malformed"])
+    def csv_file(self, request, tmp_path_factory):
+        """Write each CSV case once per class; returns its path and expected mapping."""
+        content, expected = request.param
+        csv_path = tmp_path_factory.mktemp("csv") / "users.csv"
+        csv_path.write_text(content)
+        return str(csv_path), expected
+    
+    def test_load_user_countries(self, csv_file):
+        """Test loading valid, empty and malformed CSV files."""
+        csv_path, expected = csv_file
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_data)
-            temp_csv_path = f.name
+        result = load_user_countries(csv_path)
         
-        try:
-            result = load_user_countries(temp_csv_path)
-            
-            assert isinstance(result, dict)
-            assert len(result) == 3
-            assert result[1] == "Germany"
-            assert result[2] == "France"
-            assert result[3] == "United States"
-            
-        finally:
-            os.unlink(temp_csv_path)
-    
-    def test_load_user_countries_empty_file(self):
-        """Test loading empty CSV file."""
-        # Create empty CSV file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write("")
-            temp_csv_path = f.name
-        
-        try:
-            result = load_user_countries(temp_csv_path)
-            assert result == {}
-            
-        finally:
-            os.unlink(temp_csv_path)
+        # Empty and malformed files load as an empty dict
+        assert isinstance(result, dict)
+        assert result == expected
     
     def test_load_user_countries_invalid_file(self):
         """Test loading non-existent CSV file."""
         result = load_user_countries("non_existent_file.csv")
         assert result == {}
     
-    def test_load_user_countries_malformed_csv(self):
-        """Test loading malformed CSV file."""
-        # Create malformed CSV file
-        csv_data = "invalid,csv,format\nno,semicolon,separators"
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            f.write(csv_data)
-            temp_csv_path = f.name
-        
-        try:
-            result = load_user_countries(temp_csv_path)
-            # Should return empty dict on error
-            assert result == {}
-            
-        finally:
-            os.unlink(temp_csv_path)
+    def test_load_user_countries_cached_until_modified(self, tmp_path):
+        """Test that the mapping is reused until the file changes."""
+        csv_path = tmp_path / "users.csv"
+        csv_path.write_text("user_id;country\n1;Germany\n")
+        
+        first = load_user_countries(str(csv_path))
+        assert load_user_countries(str(csv_path)) is first
+        
+        # Rewrite the file with a newer modification time
+        csv_path.write_text("user_id;country\n1;France\n")
+        stat = csv_path.stat()
+        os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        
+        assert load_user_countries(str(csv_path)) == {1: "France"}
+    
+    def test_get_user_countries_uses_preloaded_mapping(self):
+        """Test that the dependency returns the mapping stored on app.state."""
+        preloaded = {1: "Germany"}
+        request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(user_countries=preloaded)))
+        
+        assert get_user_countries(request) is preloaded
+    
+    def test_get_user_countries_falls_back_to_loader(self, tmp_path, monkeypatch):
+        """Test that the dependency loads the CSV when nothing was preloaded."""
+        csv_path = tmp_path / "users.csv"
+        csv_path.write_text("user_id;country\n1;Germany\n")
+        monkeypatch.setattr(data_loader.settings, "user_countries_path", str(csv_path))
+        request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace()))
+        
+        user_countries = get_user_countries(request)
+        
+        assert user_countries == {1: "Germany"}
+
+
+class TestResponseCache:
+    """Test class for the report response cache decorator."""
+    
+    class FakeCache:
+        """In-memory stand-in for RedisCache."""
+        
+        def __init__(self):
+            self.store = {}
+        
+        def get(self, key):
+            return self.store.get(key)
+        
+        def set(self, key, value, expire):
+            self.store[key] = value
+    
+    def test_cached_passthrough_when_disabled(self, monkeypatch):
+        """Test that endpoints run uncached when no cache is configured."""
+        monkeypatch.setattr(cache_module, "_cache", None)
+        calls = []
+        
+        @cache_module.cached(prefix="report")
+        def endpoint(days=30):
+            calls.append(days)
+            return {"days": days}
+        
+        assert endpoint(days=7) == {"days": 7}
+        assert endpoint(days=7) == {"days": 7}
+        assert calls == [7, 7]
+    
+    def test_cached_keys_on_parameters(self, monkeypatch):
+        """Test that repeated parameters hit the cache and new ones miss it."""
+        fake = self.FakeCache()
+        monkeypatch.setattr(cache_module, "_cache", fake)
+        calls = []
+        
+        @cache_module.cached(prefix="report")
+        def endpoint(days=30, db=None):
+            calls.append(days)
+            return {"days": days}
+        
+        assert endpoint(days=7, db=Session()) == {"days": 7}
+        assert endpoint(days=7, db=Session()) == {"days": 7}
+        assert endpoint(days=14, db=Session()) == {"days": 14}
+        assert calls == [7, 14]
+        assert all(key.startswith("report:endpoint:") for key in fake.store)
 
 
 class TestTransactionAnalytics:
     """Test class for transaction analytics utilities."""
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def mock_db_session(self):
-        """Mock database session for testing."""
-        class MockQuery:
-            def __init__(self, data=None):
-                self.data = data or []
-                self.filters = []
-                self.group_by_fields = []
-            
-            def filter(self, *args):
-                self.filters.extend(args)
-                return self
-            
-            def group_by(self, *args):
-                self.group_by_fields.extend(args)
-                return self
-            
-            def order_by(self, *args):
-                return self
-            
-            def limit(self, limit):
-                return self
-            
-            def all(self):
-                # Return mock data based on filters
-                if any('successful' in str(f) for f in self.filters):
-                    return [
-                        MockResult(100, 5000.0, 50.0, 10.0, 100.0),
-                        MockResult(50, 2500.0, 50.0, 20.0, 80.0)
-                    ]
-                return []
-            
-            def first(self):
-                results = self.all()
-                return results[0] if results else MockResult(0, 0.0, 0.0, 0.0, 0.0)
-        
-        class MockResult:
-            def __init__(self, count, total, avg, min_amt, max_amt):
-                self.total_count = count
-                self.total_amount = total
-                self.avg_amount = avg
-                self.min_amount = min_amt
-                self.max_amount = max_amt
-                self.successful_count = count
-                self.successful_amount = total
-                self.successful_avg = avg
-                self.failed_count = 0
-                self.failed_amount = 0.0
-                # Add missing attributes for type breakdown tests
-                self.count = count
-                self.amount = total
-        
-        class MockSession:
-            def query(self, *args):
-                return MockQuery()
-        
-        return MockSession()
+        """Mock database session returning one row with every queried column."""
+        result = SimpleNamespace(
+            # Comprehensive metrics
+            total_count=100, total_amount=5000.0, avg_amount=50.0,
+            min_amount=10.0, max_amount=100.0,
+            successful_count=100, successful_amount=5000.0, failed_count=0,
+            payment_count=100, payment_amount=5000.0, invoice_count=0, invoice_amount=0.0,
+            # Daily trends and monthly comparison
+            date=date.today(), month_start=date.today().replace(day=1),
+            count=100, amount_change=12.5, count_change=None,
+            # Top transactions
+            id=1, user_id=1, amount=100.0, status=TransactionStatus.SUCCESSFUL,
+            type=TransactionType.PAYMENT, transaction_date=datetime.now()
+        )
+        return _mock_session(rows=[result], first=result)
+    
+    @pytest.fixture(scope="class")
+    def analytics(self, mock_db_session):
+        """Analytics instance over the mock session."""
+        return TransactionAnalytics(mock_db_session)
     
-    def test_analytics_initialization(self, mock_db_session):
+    def test_analytics_initialization(self, analytics, mock_db_session):
         """Test TransactionAnalytics initialization."""
-        analytics = TransactionAnalytics(mock_db_session)
         assert analytics.db == mock_db_session
     
-    def test_get_comprehensive_metrics_structure(self, mock_db_session):
+    def test_build_base_filters(self, date_range):
+        """Test that None filters add no status or type condition."""
+        start_date, end_date = date_range
+        
+        assert len(_build_base_filters(start_date, end_date)) == 2
+        
+        filters = _build_base_filters(
+            start_date, end_date, TransactionStatus.FAILED, TransactionType.INVOICE
+        )
+        assert len(filters) == 4
+        assert filters[2].right.value == TransactionStatus.FAILED
+        assert filters[3].right.value == TransactionType.INVOICE
+    
+    def test_get_comprehensive_metrics_structure(self, analytics, date_range):
         """Test structure of comprehensive metrics."""
-        analytics = TransactionAnalytics(mock_db_session)
-        
-        start_date = date.today() - timedelta(days=30)
-        end_date = date.today()
+        start_date, end_date = date_range
         
         metrics = analytics.get_comprehensive_metrics(start_date, end_date)
         
@@ -166,12 +219,9 @@ class TestTransactionAnalytics:
         assert 'count' in type_breakdown['payment']
         assert 'amount' in type_breakdown['payment']
     
-    def test_get_daily_trends_structure(self, mock_db_session):
+    def test_get_daily_trends_structure(self, analytics, date_range):
         """Test structure of daily trends."""
-        analytics = TransactionAnalytics(mock_db_session)
-        
-        start_date = date.today() - timedelta(days=30)
-        end_date = date.today()
+        start_date, end_date = date_range
         
         trends = analytics.get_daily_trends(start_date, end_date)
         
@@ -187,12 +237,10 @@ class TestTransactionAnalytics:
             for field in required_fields:
                 assert field in first_day
     
-    def test_get_monthly_comparison_structure(self, mock_db_session):
+    def test_get_monthly_comparison_structure(self, analytics, date_range):
         """Test structure of monthly comparison."""
-        analytics = TransactionAnalytics(mock_db_session)
-        
-        start_date = date.today() - timedelta(days=90)
-        end_date = date.today()
+        end_date = date_range[1]
+        start_date = end_date - timedelta(days=90)
         
         monthly = analytics.get_monthly_comparison(start_date, end_date)
         
@@ -208,12 +256,9 @@ class TestTransactionAnalytics:
             for field in required_fields:
                 assert field in first_month
     
-    def test_get_top_transactions_structure(self, mock_db_session):
+    def test_get_top_transactions_structure(self, analytics, date_range):
         """Test structure of top transactions."""
-        analytics = TransactionAnalytics(mock_db_session)
-        
-        start_date = date.today() - timedelta(days=30)
-        end_date = date.today()
+        start_date, end_date = date_range
         
         top_transactions = analytics.get_top_transactions(start_date, end_date, 5)
         
@@ -234,56 +279,20 @@ class TestTransactionAnalytics:
 class TestAnalyticsEdgeCases:
     """Test edge cases for analytics functions."""
     
-    @pytest.fixture
+    @pytest.fixture(scope="class")
     def empty_db_session(self):
         """Mock empty database session."""
-        class MockEmptyQuery:
-            def filter(self, *args):
-                return self
-            
-            def group_by(self, *args):
-                return self
-            
-            def order_by(self, *args):
-                return self
-            
-            def limit(self, limit):
-                return self
-            
-            def all(self):
-                return []
-            
-            def first(self):
-                return MockEmptyResult()
-        
-        class MockEmptyResult:
-            def __init__(self):
-                self.total_count = 0
-                self.total_amount = 0.0
-                self.avg_amount = 0.0
-                self.min_amount = 0.0
-                self.max_amount = 0.0
-                self.successful_count = 0
-                self.successful_amount = 0.0
-                self.successful_avg = 0.0
-                self.failed_count = 0
-                self.failed_amount = 0.0
-                # Add missing attributes for type breakdown tests
-                self.count = 0
-                self.amount = 0.0
-        
-        class MockEmptySession:
-            def query(self, *args):
-                return MockEmptyQuery()
-        
-        return MockEmptySession()
+        empty_result = SimpleNamespace(
+            total_count=0, total_amount=0.0, avg_amount=0.0, min_amount=0.0, max_amount=0.0,
+            successful_count=0, successful_amount=0.0, failed_count=0,
+            payment_count=0, payment_amount=0.0, invoice_count=0, invoice_amount=0.0
+        )
+        return _mock_session(rows=[], first=empty_result)
     
-    def test_empty_data_handling(self, empty_db_session):
+    def test_empty_data_handling(self, empty_db_session, date_range):
         """Test analytics with empty data."""
         analytics = TransactionAnalytics(empty_db_session)
-        
-        start_date = date.today() - timedelta(days=30)
-        end_date = date.today()
+        start_date, end_date = date_range
         
         metrics = analytics.get_comprehensive_metrics(start_date, end_date)
         